@@ -1 +1,23 @@
-from .slurm_db import JobRecord, JobState, SlurmDBModel, ReadOnlySlurmDBModel
+from .slurm_db import (
+    JobRecord,
+    JobState,
+    SimpleJobRecord,
+    SlurmDBModel,
+    ReadOnlySlurmDBModel,
+    from_epoch_seconds,
+    to_epoch_seconds,
+)
+from .columnar import (
+    ACTIVE_MASK,
+    FAILURE_MASK,
+    JOB_COLUMNS,
+    TERMINAL_MASK,
+    ColumnarJobRecord,
+    ColumnarSlurmDBModel,
+    as_submitted,
+    job_dtypes,
+    jobs_to_frame,
+    state_mask,
+)
+from .arrow import ArrowSlurmDBModel, ParquetSlurmDBModel
+from .memory import InMemorySlurmDBModel
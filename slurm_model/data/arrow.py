@@ -0,0 +1,212 @@
+"""
+This file defines model of slurm db on top of arrow dataset, e.g. directory of
+parquet files with job table.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .columnar import (
+    JOB_COLUMNS,
+    ColumnarJobOuterInfo,
+    arrow_to_frame,
+    batch_records,
+)
+from .expressions import (
+    compile_condition,
+    compile_expression,
+    to_arrow_expression,
+    to_sort_column,
+)
+from .slurm_db import (
+    JobOuterInfo,
+    JobRecord,
+    JobState,
+    ReadOnlySlurmDBModel,
+    SimpleSelectQuery,
+)
+
+
+class ArrowSelectQuery(SimpleSelectQuery[JobRecord]):
+    """
+    Query over arrow dataset with job columns.
+
+    Conditions, that can be translated to arrow expressions (see
+    `to_arrow_expression`), are pushed down to dataset scan, so rows, that do
+    not match them, are never materialized. Other conditions are compiled to
+    single predicate (see `compile_condition`), that is evaluated for every
+    remaining record. Sort expressions, that are bare column names, are
+    sorted by arrow, otherwise they are evaluated for every record.
+    """
+
+    def __init__(self, dataset: ds.Dataset):
+        self._dataset = dataset
+        self._conditions: list[tuple[str, dict]] = []
+        self._orders: list[tuple[str, bool, dict]] = []
+
+    def where(self, condition: str, **kwargs) -> ArrowSelectQuery:
+        self._conditions.append((condition, kwargs))
+        return self
+
+    def order_by(
+        self, expression: str, descending: bool = False, **kwargs
+    ) -> ArrowSelectQuery:
+        self._orders.append((expression, descending, kwargs))
+        return self
+
+    def _pushdown(self) -> tuple[pc.Expression | None, list[tuple[str, dict]]]:
+        pushed = None
+        residual = []
+        for condition, kwargs in self._conditions:
+            expression = to_arrow_expression(condition, kwargs, self._dataset.schema)
+            if expression is None:
+                residual.append((condition, kwargs))
+            else:
+                pushed = expression if pushed is None else pushed & expression
+        return pushed, residual
+
+    def _sort_indices(self, table: pa.Table) -> pa.Array:
+        columns = set(table.column_names)
+        names = [to_sort_column(order[0], columns) for order in self._orders]
+        if all(name is not None for name in names):
+            keys = {}
+            sort_keys = []
+            for i, (name, (_, descending, _)) in enumerate(zip(names, self._orders)):
+                keys[f"key{i}"] = _sort_key(name, table[name])
+                order = "descending" if descending else "ascending"
+                sort_keys.append((f"key{i}", order))
+            return pc.sort_indices(pa.table(keys), sort_keys=sort_keys)
+        records = list(batch_records(table))
+        indices = list(range(len(records)))
+        # sorting is stable, so applying sorts from the last one gives
+        # lexicographical order
+        for expression, descending, kwargs in reversed(self._orders):
+            key = compile_expression(expression, kwargs)
+            indices.sort(key=lambda i: key(records[i]), reverse=descending)
+        return pa.array(indices, type=pa.int64())
+
+    def execute_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        pushed, residual = self._pushdown()
+        if not residual and not self._orders:
+            yield from self._dataset.to_batches(filter=pushed, batch_size=batch_size)
+            return
+        table = self._dataset.to_table(filter=pushed)
+        if residual:
+            records = list(batch_records(table))
+            predicate = compile_condition(residual, records)
+            mask = [predicate(rec) for rec in records]
+            table = table.filter(pa.array(mask, type=pa.bool_()))
+        if self._orders:
+            table = table.take(self._sort_indices(table))
+        yield from table.to_batches(batch_size)
+
+    def execute(self) -> Iterable[JobRecord]:
+        for batch in self.execute_batches():
+            yield from batch_records(batch)
+
+
+def _sort_key(name: str, column: pa.ChunkedArray) -> pa.ChunkedArray:
+    # arrow can not sort dictionary arrays, so they are sorted by values,
+    # states are sorted in order of `JobState` members as in other models
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if name == "state":
+        states = pa.array([state.name for state in JobState], type=column.type)
+        column = pc.index_in(column, value_set=states)
+    return column
+
+
+class ArrowSlurmDBModel(ReadOnlySlurmDBModel):
+    """
+    Read only slurm db on top of arrow dataset, that has columns described in
+    `JOB_COLUMNS`. Dataset may also contain optional `field` column, that is
+    used for `get_job_outer_info`.
+
+    Jobs are read from dataset on every request, queries push filters down to
+    dataset scan.
+    """
+
+    def __init__(self, dataset: ds.Dataset | pa.Table):
+        if isinstance(dataset, pa.Table):
+            dataset = ds.dataset(dataset)
+        self._dataset = dataset
+
+    def get_job(self, jobid: int) -> JobRecord | None:
+        table = self._dataset.to_table(filter=pc.field("jobid") == jobid)
+        return next(iter(batch_records(table)), None)
+
+    def stream_jobs(self) -> Iterable[JobRecord]:
+        for batch in self.stream_jobs_batches():
+            yield from batch_records(batch)
+
+    def stream_jobs_columnar(self) -> pd.DataFrame:
+        return arrow_to_frame(self._dataset.to_table())
+
+    def stream_jobs_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        return self._dataset.to_batches(batch_size=batch_size)
+
+    def select_jobs(self) -> SimpleSelectQuery[JobRecord]:
+        return ArrowSelectQuery(self._dataset)
+
+    def get_job_outer_info(self, jobid: int) -> JobOuterInfo:
+        if "field" not in self._dataset.schema.names:
+            return ColumnarJobOuterInfo(None)
+        table = self._dataset.to_table(
+            columns=["field"], filter=pc.field("jobid") == jobid
+        )
+        field = table["field"][0].as_py() if table.num_rows else None
+        return ColumnarJobOuterInfo(field)
+
+
+class ParquetSlurmDBModel(ArrowSlurmDBModel):
+    """
+    Read only slurm db snapshot stored in parquet file, e.g. dump of slurm
+    accounting database used for training.
+
+    Only job columns (and optional `field` column) are read once, file is
+    memory mapped, so reads do not copy data with syscall per row. Queries are
+    evaluated over loaded table and do not read file again.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        columns = list(JOB_COLUMNS)
+        if "field" in pq.read_schema(path, memory_map=True).names:
+            columns.append("field")
+        self._table = pq.read_table(path, columns=columns, memory_map=True)
+        super().__init__(self._table)
+        self._index: dict[int, int] | None = None
+
+    def _row(self, jobid: int) -> int | None:
+        # index by jobid is built once on first lookup, found row is viewed
+        # without copying the rest of table
+        if self._index is None:
+            jobids = self._table["jobid"].to_pylist()
+            self._index = dict(zip(jobids, range(len(jobids))))
+        return self._index.get(jobid)
+
+    def get_job(self, jobid: int) -> JobRecord | None:
+        row = self._row(jobid)
+        if row is None:
+            return None
+        return next(iter(batch_records(self._table.slice(row, 1))))
+
+    def stream_jobs_columnar(self) -> pd.DataFrame:
+        return arrow_to_frame(self._table)
+
+    def stream_jobs_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        # chunks of table are row groups of file
+        return self._table.to_batches(batch_size)
+
+    def get_job_outer_info(self, jobid: int) -> JobOuterInfo:
+        row = self._row(jobid)
+        if row is None or "field" not in self._table.column_names:
+            return ColumnarJobOuterInfo(None)
+        return ColumnarJobOuterInfo(self._table["field"][row].as_py())
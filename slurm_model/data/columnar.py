@@ -0,0 +1,633 @@
+"""
+This file defines columnar (structure of arrays) model of slurm db.
+
+Jobs are stored as `pandas.DataFrame` with one column per `JobRecord` field,
+so feature engeneering can be done with vectorised pandas/numpy operations
+instead of per-record property access.
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .slurm_db import (
+    JobOuterInfo,
+    JobRecord,
+    JobState,
+    ReadOnlySlurmDBModel,
+    SimpleSelectQuery,
+    from_epoch_seconds,
+)
+
+
+STATE_DTYPE = pd.CategoricalDtype([state.name for state in JobState])
+"""Categorical dtype of `state` column, category code of state is `value - 1`"""
+
+NODES_TYPE = pa.list_(pa.dictionary(pa.int16(), pa.string()))
+"""
+Arrow type of `nodes` column, node names are interned into dictionary, so each
+allocated node takes two bytes
+"""
+
+JOB_COLUMNS: dict[str, Any] = {
+    "alloc_nodes": "int32",
+    "elapsed": "timedelta64[s]",
+    "end": "datetime64[s]",
+    "exitcode": "int32",
+    "gid": "category",
+    "jobid": "int64",
+    "jobname": "category",
+    "nodes": pd.ArrowDtype(NODES_TYPE),
+    "partition": "category",
+    "priority": "int64",
+    "req_cpus": "int32",
+    "start": "datetime64[s]",
+    "state": STATE_DTYPE,
+    "submit": "datetime64[s]",
+    "timelimit": "timedelta64[s]",
+    "uid": "category",
+}
+"""
+Columns of job table and their dtypes. Column names are the same as names of
+`JobRecord` properties. Missing `start` and `end` are stored as `NaT`.
+
+Low-cardinality string columns are categorical, so they are stored as integer
+codes and comparisons with them are integer comparisons. Categories of these
+columns can be fixed with `job_dtypes`.
+
+All time columns have seconds resolution, so their int64 view is the same as
+`*_s` properties of `JobRecord`.
+"""
+
+JOB_SCHEMA = pa.schema(
+    [
+        ("alloc_nodes", pa.int32()),
+        ("elapsed", pa.duration("s")),
+        ("end", pa.timestamp("s")),
+        ("exitcode", pa.int32()),
+        ("gid", pa.dictionary(pa.int16(), pa.string())),
+        ("jobid", pa.int64()),
+        ("jobname", pa.dictionary(pa.int32(), pa.string())),
+        ("nodes", NODES_TYPE),
+        ("partition", pa.dictionary(pa.int16(), pa.string())),
+        ("priority", pa.int64()),
+        ("req_cpus", pa.int32()),
+        ("start", pa.timestamp("s")),
+        ("state", pa.dictionary(pa.int8(), pa.string())),
+        ("submit", pa.timestamp("s")),
+        ("timelimit", pa.duration("s")),
+        ("uid", pa.dictionary(pa.int16(), pa.string())),
+    ]
+)
+"""Arrow schema of job table, see `JOB_COLUMNS`"""
+
+TIME_COLUMNS = ("elapsed", "end", "start", "submit", "timelimit")
+_INT32_COLUMNS = ("alloc_nodes", "exitcode", "req_cpus")
+_SORT_COLUMNS = set(JOB_COLUMNS) - {"nodes"}
+_NAT = np.iinfo(np.int64).min
+
+
+def state_mask(*states: JobState) -> np.ndarray:
+    """
+    Returns lookup table from codes of `state` column to whether job is in one
+    of given states, so `mask[codes]` is boolean mask of jobs computed without
+    branching. Missing state (code -1) maps to False.
+    """
+    # extra last element is used for code -1
+    mask = np.zeros(len(JobState) + 1, dtype=bool)
+    mask[[state.value - 1 for state in states]] = True
+    return mask
+
+
+FAILURE_MASK = state_mask(
+    JobState.FAILED,
+    JobState.TIMEOUT,
+    JobState.NODE_FAIL,
+    JobState.BOOT_FAIL,
+    JobState.DEADLINE,
+    JobState.OOM,
+)
+"""Job finished because of failure, see `state_mask`"""
+
+ACTIVE_MASK = state_mask(JobState.PENDING, JobState.RUNNING, JobState.SUSPENDED)
+"""Job is not finished, see `state_mask`"""
+
+TERMINAL_MASK = ~ACTIVE_MASK
+TERMINAL_MASK[-1] = False
+"""Job is finished, see `state_mask`"""
+
+
+def job_dtypes(categories: Mapping[str, Iterable[str]] | None = None) -> dict[str, Any]:
+    """
+    Returns dtypes of job columns, where categorical columns from `categories`
+    have fixed categories, e.g. all partitions of cluster. Codes of columns
+    with the same categories are comparable between tables, values that are
+    not in categories become missing.
+    """
+    dtypes = dict(JOB_COLUMNS)
+    for name, values in (categories or {}).items():
+        dtypes[name] = pd.CategoricalDtype(list(values))
+    return dtypes
+
+
+def jobs_to_frame(
+    records: Iterable[JobRecord], categories: Mapping[str, Iterable[str]] | None = None
+) -> pd.DataFrame:
+    """
+    Builds columnar representation of given job records, see `job_dtypes` for
+    `categories`.
+    """
+    columns: dict[str, list] = {name: [] for name in JOB_COLUMNS}
+    for rec in records:
+        for name, values in columns.items():
+            values.append(getattr(rec, name))
+    columns["state"] = [state.name for state in columns["state"]]
+    columns["nodes"] = pd.array(columns["nodes"], dtype=JOB_COLUMNS["nodes"])
+    return pd.DataFrame(columns).astype(job_dtypes(categories))
+
+
+def frame_to_arrow(jobs: pd.DataFrame) -> pa.Table:
+    """Converts job table to arrow table with `JOB_SCHEMA`"""
+    table = pa.Table.from_pandas(jobs[list(JOB_COLUMNS)], preserve_index=False)
+    # dtypes are restored by `arrow_to_frame`, pandas metadata is not needed
+    return table.replace_schema_metadata(None).cast(JOB_SCHEMA)
+
+
+def records_to_batches(
+    records: Iterable[JobRecord], batch_size: int
+) -> Iterable[pa.RecordBatch]:
+    """Groups job records into arrow record batches of at most `batch_size` rows"""
+    records = iter(records)
+    while batch := list(itertools.islice(records, batch_size)):
+        yield from frame_to_arrow(jobs_to_frame(batch)).to_batches()
+
+
+def arrow_to_frame(jobs: pa.RecordBatch | pa.Table) -> pd.DataFrame:
+    """Converts arrow table with job columns to job table"""
+    frame = jobs.to_pandas(types_mapper=_list_types_mapper, ignore_metadata=True)
+    return frame.astype(JOB_COLUMNS)
+
+
+def _list_types_mapper(type: pa.DataType) -> pd.ArrowDtype | None:
+    # keep lists in arrow, so nodes are not converted to python objects
+    return pd.ArrowDtype(type) if pa.types.is_list(type) else None
+
+
+def batch_records(batch: pa.RecordBatch | pa.Table) -> Iterable[JobRecord]:
+    """Yields views of rows of arrow record batch with job columns"""
+    return ColumnarSlurmDBModel(arrow_to_frame(batch)).stream_jobs()
+
+
+def as_submitted(jobs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns copy of job table, where every job is represented as if it was
+    just submitted: it is pending, has no start, end and allocated nodes.
+    """
+    jobs = jobs.copy()
+    jobs["elapsed"] = pd.Timedelta(0)
+    jobs["start"] = pd.NaT
+    jobs["end"] = pd.NaT
+    jobs["exitcode"] = 0
+    jobs["nodes"] = pd.array([[]] * len(jobs), dtype=JOB_COLUMNS["nodes"])
+    jobs["state"] = JobState.PENDING.name
+    return jobs.astype(JOB_COLUMNS)
+
+
+class ColumnarJobRecord(JobRecord):
+    """
+    Lightweight view of single row of `ColumnarSlurmDBModel`. Every property
+    is a lookup into column array of the model, no data is copied.
+
+    Time columns are kept as int64 seconds, `datetime` and `timedelta` objects
+    are created only when corresponding property is accessed.
+    """
+
+    __slots__ = ("_db", "_row")
+
+    def __init__(self, db: ColumnarSlurmDBModel, row: int):
+        self._db = db
+        self._row = row
+
+    def _category(self, name: str) -> str | None:
+        code = self._db._values[name][self._row]
+        return None if code < 0 else self._db._categories[name][code]
+
+    @property
+    def alloc_nodes(self) -> int:
+        return int(self._db._values["alloc_nodes"][self._row])
+
+    @property
+    def elapsed(self) -> timedelta:
+        return timedelta(seconds=self.elapsed_s)
+
+    @property
+    def elapsed_s(self) -> int:
+        return int(self._db._values["elapsed"][self._row])
+
+    @property
+    def end(self) -> datetime | None:
+        end = self.end_s
+        return None if end is None else from_epoch_seconds(end)
+
+    @property
+    def end_s(self) -> int | None:
+        end = int(self._db._values["end"][self._row])
+        return None if end == _NAT else end
+
+    @property
+    def exitcode(self) -> int:
+        return int(self._db._values["exitcode"][self._row])
+
+    @property
+    def gid(self) -> str:
+        return self._category("gid")
+
+    @property
+    def jobid(self) -> int:
+        return int(self._db._values["jobid"][self._row])
+
+    @property
+    def jobname(self) -> str:
+        return self._category("jobname")
+
+    @property
+    def nodes(self) -> list[str]:
+        return self._db._categories["nodes"][self.node_codes].tolist()
+
+    @property
+    def node_codes(self) -> np.ndarray:
+        """Codes of allocated nodes in `ColumnarSlurmDBModel.node_names`"""
+        offsets = self._db._node_offsets
+        return self._db._values["nodes"][offsets[self._row] : offsets[self._row + 1]]
+
+    @property
+    def partition(self) -> str:
+        return self._category("partition")
+
+    @property
+    def priority(self) -> int:
+        return int(self._db._values["priority"][self._row])
+
+    @property
+    def req_cpus(self) -> int:
+        return int(self._db._values["req_cpus"][self._row])
+
+    @property
+    def start(self) -> datetime | None:
+        start = self.start_s
+        return None if start is None else from_epoch_seconds(start)
+
+    @property
+    def start_s(self) -> int | None:
+        start = int(self._db._values["start"][self._row])
+        return None if start == _NAT else start
+
+    @property
+    def state(self) -> JobState:
+        return JobState(int(self._db._values["state"][self._row]) + 1)
+
+    @property
+    def submit(self) -> datetime:
+        return from_epoch_seconds(self.submit_s)
+
+    @property
+    def submit_s(self) -> int:
+        return int(self._db._values["submit"][self._row])
+
+    @property
+    def timelimit(self) -> timedelta:
+        return timedelta(seconds=self.timelimit_s)
+
+    @property
+    def timelimit_s(self) -> int:
+        return int(self._db._values["timelimit"][self._row])
+
+    @property
+    def uid(self) -> str:
+        return self._category("uid")
+
+
+class ColumnarJobOuterInfo(JobOuterInfo):
+    __slots__ = ("_field",)
+
+    def __init__(self, field: str | None):
+        self._field = field
+
+    @property
+    def field(self) -> str | None:
+        return self._field
+
+
+class ColumnarSelectQuery(SimpleSelectQuery[JobRecord]):
+    """
+    Query over `ColumnarSlurmDBModel`. Conditions and sort expressions, that
+    pandas evaluates the same way as python (see `is_pandas_expression`), are
+    evaluated by `pandas.DataFrame.eval` over whole columns at once. Other
+    expressions, and expressions pandas fails to evaluate, are evaluated for
+    every remaining record.
+
+    Besides columns, `*_s` properties of `JobRecord` and names of `JobState`
+    members can be used in expressions, `JobState` values of kwargs are
+    compared with `state` column by name. Missing `*_s` values are NaN.
+    Integer columns are evaluated as int64, so arithmetic on them does not
+    overflow int32.
+
+    Sorting by single bare column name (e.g. `order_by("submit")`) uses order
+    of rows, that is computed once per db.
+    """
+
+    def __init__(self, db: ColumnarSlurmDBModel):
+        self._db = db
+        self._conditions: list[tuple[str, dict]] = []
+        self._orders: list[tuple[str, bool, dict]] = []
+
+    def where(self, condition: str, **kwargs) -> ColumnarSelectQuery:
+        self._conditions.append((condition, kwargs))
+        return self
+
+    def order_by(
+        self, expression: str, descending: bool = False, **kwargs
+    ) -> ColumnarSelectQuery:
+        self._orders.append((expression, descending, kwargs))
+        return self
+
+    def _eval(self, frame: pd.DataFrame, expression: str, kwargs: dict) -> Any:
+        resolvers = {state.name: state.name for state in JobState}
+        for name in TIME_COLUMNS:
+            seconds = self._db._values[name][: len(frame)]
+            missing = seconds == _NAT
+            if missing.any():
+                seconds = np.where(missing, np.nan, seconds)
+            resolvers[f"{name}_s"] = pd.Series(seconds, index=frame.index)
+        for name in _INT32_COLUMNS:
+            if name in expression:
+                resolvers[name] = frame[name].astype(np.int64)
+        resolvers.update((name, _state_names(value)) for name, value in kwargs.items())
+        return frame.eval(expression, resolvers=(resolvers,))
+
+    def _records(self, rows: np.ndarray) -> list[ColumnarJobRecord]:
+        return [ColumnarJobRecord(self._db, row) for row in rows]
+
+    def _mask(self, frame: pd.DataFrame) -> np.ndarray:
+        from .expressions import compile_condition, is_pandas_expression
+
+        mask = np.ones(len(frame), dtype=bool)
+        residual = []
+        for condition, kwargs in self._conditions:
+            if is_pandas_expression(condition, kwargs, condition=True):
+                try:
+                    result = self._eval(frame, condition, kwargs)
+                    mask &= np.asarray(result, dtype=bool)
+                    continue
+                except Exception:
+                    pass
+            residual.append((condition, kwargs))
+        if residual:
+            rows = np.flatnonzero(mask)
+            records = self._records(rows)
+            predicate = compile_condition(residual, records)
+            mask[rows] = [predicate(rec) for rec in records]
+        return mask
+
+    def _key(
+        self, frame: pd.DataFrame, rows: np.ndarray, expression: str, kwargs: dict
+    ) -> Any:
+        from .expressions import compile_expression, is_pandas_expression
+
+        if is_pandas_expression(expression, kwargs, condition=False):
+            try:
+                key = self._eval(frame, expression, kwargs)
+                if isinstance(key, pd.Series):
+                    if isinstance(key.dtype, pd.CategoricalDtype):
+                        key = _sorted_categories(key)
+                    return key.iloc[rows].reset_index(drop=True)
+                return key
+            except Exception:
+                pass
+        key = compile_expression(expression, kwargs)
+        return pd.Series([key(rec) for rec in self._records(rows)], dtype=object)
+
+    def _rows(self) -> np.ndarray:
+        from .expressions import to_sort_column
+
+        frame = self._db.stream_jobs_columnar()
+        mask = self._mask(frame)
+        if len(self._orders) == 1:
+            expression, descending, kwargs = self._orders[0]
+            column = to_sort_column(expression, _SORT_COLUMNS)
+            if column is not None and expression.strip() not in kwargs:
+                # order of all rows is computed once per db, so it is only
+                # filtered here
+                order = self._db._sort_order(column, descending)
+                if len(order) > len(frame):
+                    order = order[order < len(frame)]
+                return order[mask[order]]
+        rows = np.flatnonzero(mask)
+        if not self._orders:
+            return rows
+        keys = {}
+        for i, (expression, _, kwargs) in enumerate(self._orders):
+            key = self._key(frame, rows, expression, kwargs)
+            # constant keys do not affect order
+            if isinstance(key, pd.Series):
+                keys[i] = key
+        if not keys:
+            return rows
+        keys = pd.DataFrame(keys)
+        keys = keys.sort_values(
+            list(keys.columns),
+            ascending=[not self._orders[i][1] for i in keys.columns],
+            kind="stable",
+        )
+        return rows[keys.index.to_numpy()]
+
+    def execute(self) -> Iterable[JobRecord]:
+        for row in self._rows():
+            yield ColumnarJobRecord(self._db, row)
+
+    def execute_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        return self._db._arrow().take(self._rows()).to_batches(batch_size)
+
+
+def _sorted_categories(key: pd.Series) -> pd.Series:
+    # categorical key is sorted by values as in `_sort_order`
+    if key.dtype == STATE_DTYPE:
+        return key
+    return key.cat.set_categories(key.cat.categories.sort_values())
+
+
+def _category_ranks(categories: np.ndarray) -> np.ndarray:
+    """
+    Returns lookup table from category codes to ranks of their values, pinned
+    categories (see `job_dtypes`) are not sorted. Missing code -1 maps to the
+    extra last rank.
+    """
+    ranks = np.empty(len(categories) + 1, dtype=np.int64)
+    ranks[np.argsort(categories.astype(str), kind="stable")] = np.arange(
+        len(categories)
+    )
+    ranks[-1] = len(categories)
+    return ranks
+
+
+def _state_names(value: Any) -> Any:
+    if isinstance(value, JobState):
+        return value.name
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_state_names(item) for item in value]
+    return value
+
+
+class ColumnarSlurmDBModel(ReadOnlySlurmDBModel):
+    """
+    Read only slurm db, that stores jobs in `pandas.DataFrame` with columns
+    described in `JOB_COLUMNS`. Frame may also contain optional `field` column,
+    that is used for `get_job_outer_info`. Categories of categorical columns can
+    be fixed, see `job_dtypes`.
+
+    Each column is kept as contiguous numpy array (categorical columns are kept
+    as codes, time columns as int64 seconds), records returned by this model
+    are views of rows. Allocated nodes are kept as flat array of node codes
+    with offsets of each job.
+    """
+
+    def __init__(
+        self, jobs: pd.DataFrame, categories: Mapping[str, Iterable[str]] | None = None
+    ):
+        self._frame = jobs.astype(job_dtypes(categories))
+        self._values: dict[str, np.ndarray] = {}
+        self._categories: dict[str, np.ndarray] = {}
+        for name in JOB_COLUMNS:
+            column = self._frame[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                self._values[name] = column.cat.codes.to_numpy()
+                self._categories[name] = column.cat.categories.to_numpy()
+            elif name in TIME_COLUMNS:
+                self._values[name] = column.to_numpy().view("i8")
+            elif name == "nodes":
+                nodes = pa.array(column)
+                if isinstance(nodes, pa.ChunkedArray):
+                    nodes = nodes.combine_chunks()
+                self._node_offsets = nodes.offsets.to_numpy()
+                self._values[name] = nodes.values.indices.to_numpy()
+                self._categories[name] = nodes.values.dictionary.to_numpy(
+                    zero_copy_only=False
+                )
+            else:
+                self._values[name] = column.to_numpy()
+        # lazily built structures, shared with models returned by `head`
+        self._shared: dict[str, Any] = {}
+        self._len = len(self._frame)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[JobRecord],
+        categories: Mapping[str, Iterable[str]] | None = None,
+    ) -> ColumnarSlurmDBModel:
+        return cls(jobs_to_frame(records, categories))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _jobid_index(self) -> dict[int, int]:
+        if "index" not in self._shared:
+            jobids = self._values["jobid"].tolist()
+            self._shared["index"] = dict(zip(jobids, range(len(jobids))))
+        return self._shared["index"]
+
+    def _row(self, jobid: int) -> int | None:
+        row = self._jobid_index().get(jobid)
+        return None if row is None or row >= self._len else row
+
+    def _sort_order(self, name: str, descending: bool) -> np.ndarray:
+        """
+        Stable permutation of all rows, that sorts them by column as
+        `pandas.DataFrame.sort_values`: ties keep their order, missing values
+        are last. Categorical columns are sorted by values, not by order of
+        categories, except `state`, which is sorted in order of `JobState`.
+        Permutation is computed on first request.
+        """
+        key = ("order", name, descending)
+        if key not in self._shared:
+            values = self._values[name]
+            if name in self._categories:
+                missing = values < 0
+                if name != "state":
+                    values = _category_ranks(self._categories[name])[values]
+            elif name in TIME_COLUMNS:
+                missing = values == _NAT
+            else:
+                missing = np.zeros(len(values), dtype=bool)
+            if descending:
+                # stable descending sort, where ties keep their order
+                order = np.argsort(values[::-1], kind="stable")
+                order = (len(values) - 1 - order)[::-1]
+            else:
+                order = np.argsort(values, kind="stable")
+            if missing.any():
+                order = np.concatenate(
+                    [order[~missing[order]], np.flatnonzero(missing)]
+                )
+            self._shared[key] = order
+        return self._shared[key]
+
+    @property
+    def node_names(self) -> np.ndarray:
+        """Names of nodes, codes of nodes are indices in this array"""
+        return self._categories["nodes"]
+
+    def jobs_on_nodes(self, nodes: Iterable[str]) -> np.ndarray:
+        """Returns mask of jobs, that have any of given nodes allocated"""
+        targets = np.flatnonzero(np.isin(self.node_names, list(nodes)))
+        offsets = self._node_offsets[: self._len + 1]
+        hits = np.isin(self._values["nodes"][offsets[0] : offsets[-1]], targets)
+        jobs = np.repeat(np.arange(self._len), np.diff(offsets))
+        return np.bincount(jobs, weights=hits, minlength=self._len) > 0
+
+    def _arrow(self) -> pa.Table:
+        if "table" not in self._shared:
+            self._shared["table"] = frame_to_arrow(self._frame)
+        return self._shared["table"].slice(0, self._len)
+
+    def head(self, n: int) -> ColumnarSlurmDBModel:
+        """
+        Returns model, that contains only first `n` jobs of this model. Columns
+        and lazily built indices are shared, so this operation is cheap.
+        """
+        db = copy.copy(self)
+        db._len = min(n, self._len)
+        return db
+
+    def get_job(self, jobid: int) -> JobRecord | None:
+        row = self._row(jobid)
+        return None if row is None else ColumnarJobRecord(self, row)
+
+    def stream_jobs(self) -> Iterable[JobRecord]:
+        for row in range(len(self)):
+            yield ColumnarJobRecord(self, row)
+
+    def stream_jobs_columnar(self) -> pd.DataFrame:
+        if self._len == len(self._frame):
+            return self._frame
+        return self._frame.iloc[: self._len]
+
+    def stream_jobs_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        return self._arrow().to_batches(batch_size)
+
+    def select_jobs(self) -> SimpleSelectQuery[JobRecord]:
+        return ColumnarSelectQuery(self)
+
+    def get_job_outer_info(self, jobid: int) -> JobOuterInfo:
+        row = self._row(jobid)
+        if row is None or "field" not in self._frame:
+            return ColumnarJobOuterInfo(None)
+        field = self._frame["field"].iat[row]
+        return ColumnarJobOuterInfo(None if pd.isna(field) else field)
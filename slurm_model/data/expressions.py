@@ -0,0 +1,469 @@
+"""
+This file defines evaluation of `SimpleSelectQuery` expressions: translation
+of conditions to arrow compute expressions, that can be pushed down to storage,
+and fallback evaluation of expressions for every record.
+"""
+
+from __future__ import annotations
+
+import ast
+import operator
+from datetime import datetime, timedelta
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .columnar import JOB_COLUMNS, JOB_SCHEMA, TIME_COLUMNS
+from .slurm_db import JobRecord, JobState
+
+
+_PROPERTIES = frozenset(JOB_COLUMNS) | {f"{name}_s" for name in TIME_COLUMNS}
+
+
+def compile_expression(expression: str, kwargs: dict) -> Callable[[JobRecord], Any]:
+    """
+    Compiles expression once to function of record, that evaluates it with
+    properties of record, members of `JobState` by their names and kwargs in
+    namespace. Only properties of record, that are used by expression, are
+    fetched for every record.
+    """
+    code = compile(expression.strip(), "<expression>", "eval")
+    names = set(code.co_names)
+    constants = {state.name: state for state in JobState if state.name in names}
+    constants.update((name, value) for name, value in kwargs.items() if name in names)
+    properties = [name for name in names & _PROPERTIES if name not in constants]
+    # builtins are resolved from globals
+    scope: dict[str, Any] = {}
+
+    def evaluate(rec: JobRecord) -> Any:
+        ns = {name: getattr(rec, name) for name in properties}
+        ns.update(constants)
+        return eval(code, scope, ns)
+
+    return evaluate
+
+
+class _Binder(ast.NodeTransformer):
+    """
+    Rewrites names in expression: properties are read from `_rec` argument,
+    kwargs are renamed to unique globals, which are stored in `scope`.
+    """
+
+    def __init__(self, kwargs: dict, prefix: str, scope: dict):
+        self._kwargs = kwargs
+        self._prefix = prefix
+        self._scope = scope
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        name = node.id
+        if name in self._kwargs:
+            alias = f"{self._prefix}{name}"
+            self._scope[alias] = self._kwargs[name]
+            return ast.copy_location(ast.Name(alias, ctx=node.ctx), node)
+        if name in JobState.__members__:
+            self._scope[name] = JobState[name]
+        elif name in _PROPERTIES:
+            record = ast.Name("_rec", ctx=ast.Load())
+            return ast.copy_location(ast.Attribute(record, name, ctx=node.ctx), node)
+        return node
+
+
+def _conjuncts(condition: str) -> list[ast.expr]:
+    body = ast.parse(condition.strip(), mode="eval").body
+    if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And):
+        return body.values
+    return [body]
+
+
+def _function(clauses: list[ast.expr], scope: dict) -> Callable[[JobRecord], Any]:
+    body = clauses[0] if len(clauses) == 1 else ast.BoolOp(ast.And(), clauses)
+    args = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg("_rec")],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    tree = ast.fix_missing_locations(ast.Expression(ast.Lambda(args, body)))
+    return eval(compile(tree, "<where>", "eval"), scope)
+
+
+_SAMPLE_SIZE = 1000
+# ranking evaluates every clause on sample, so it pays off only on inputs,
+# that are much larger than sample
+_RANKING_THRESHOLD = 10 * _SAMPLE_SIZE
+
+
+def compile_condition(
+    conditions: list[tuple[str, dict]], sample: Sequence[JobRecord] = ()
+) -> Callable[[JobRecord], bool]:
+    """
+    Compiles conjunction of `where` conditions to single predicate of record.
+
+    Conditions are split on top-level `and`. If `sample` has at least 10000
+    records, clauses are ordered by cost of evaluation (number of properties
+    they read) divided by share of records they filter out on 1000 records of
+    `sample`, so that cheap and selective clauses short-circuit the rest.
+    Smaller inputs are evaluated in original order, as ranking would cost
+    more, than it saves. Properties are read from record
+    only by evaluated clauses. If reordered clauses raise for some record
+    (e.g. clause was guarded by another one), conditions are evaluated for it
+    in original order.
+    """
+    scope: dict[str, Any] = {}
+    clauses = []
+    for i, (condition, kwargs) in enumerate(conditions):
+        binder = _Binder(kwargs, f"_kw{i}_", scope)
+        clauses += [binder.visit(clause) for clause in _conjuncts(condition)]
+    if not clauses:
+        return lambda rec: True
+    original = _function(clauses, scope)
+    if len(clauses) == 1 or len(sample) < _RANKING_THRESHOLD:
+        return lambda rec: bool(original(rec))
+    step = max(1, len(sample) // _SAMPLE_SIZE)
+    sample = sample[::step][:_SAMPLE_SIZE]
+
+    def rank(clause: ast.expr) -> float:
+        evaluate = _function([clause], scope)
+        rejected = 0
+        for rec in sample:
+            try:
+                rejected += not evaluate(rec)
+            except Exception:
+                rejected += 1
+        properties = {
+            node.attr
+            for node in ast.walk(clause)
+            if isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == "_rec"
+        }
+        return max(1, len(properties)) / max(rejected / len(sample), 1e-3)
+
+    ordered = sorted(clauses, key=rank)
+    if ordered == clauses:
+        return lambda rec: bool(original(rec))
+    reordered = _function(ordered, scope)
+
+    def predicate(rec: JobRecord) -> bool:
+        try:
+            return bool(reordered(rec))
+        except Exception:
+            return bool(original(rec))
+
+    return predicate
+
+
+_COLUMN_KINDS = {
+    "alloc_nodes": "number",
+    "elapsed": "timedelta",
+    "end": "datetime",
+    "exitcode": "number",
+    "gid": "string",
+    "jobid": "number",
+    "jobname": "string",
+    "partition": "string",
+    "priority": "number",
+    "req_cpus": "number",
+    "start": "datetime",
+    "state": "state",
+    "submit": "datetime",
+    "timelimit": "timedelta",
+    "uid": "string",
+}
+_ORDERED_KINDS = {"number", "datetime", "timedelta"}
+_ARITHMETIC = (ast.Add, ast.Sub, ast.Mult)
+# python raises on division by zero, so only constant divisors are allowed
+_DIVISION = (ast.Div, ast.FloorDiv, ast.Mod)
+
+
+def _value_kind(value: Any) -> str | None:
+    if isinstance(value, JobState):
+        return "state"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (datetime, np.datetime64)):
+        return "datetime"
+    if isinstance(value, (timedelta, np.timedelta64)):
+        return "timedelta"
+    if isinstance(value, (int, float, np.number)):
+        return "number"
+    return None
+
+
+class _PandasChecker:
+    """
+    Checks, that expression belongs to subset, that `pandas.DataFrame.eval`
+    evaluates the same way as python for every record: boolean operators over
+    comparisons, comparisons of values of the same kind, arithmetic over
+    numbers. Everything else (truthiness of values, `None`, `is`, function
+    calls, `nodes` column, etc.) is rejected.
+    """
+
+    def __init__(self, kwargs: dict):
+        self._kwargs = kwargs
+
+    def condition(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.BoolOp):
+            return all(self.condition(value) for value in node.values)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return self.condition(node.operand)
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        return False
+
+    def _compare(self, node: ast.Compare) -> bool:
+        left = self.kind(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if left is None or self._elements(comparator) != {left}:
+                    return False
+                right = None
+            elif isinstance(op, (ast.Eq, ast.NotEq)):
+                right = self.kind(comparator)
+                if right is None or right != left:
+                    return False
+            elif isinstance(op, (ast.Lt, ast.LtE, ast.Gt, ast.GtE)):
+                right = self.kind(comparator)
+                if right is None or right != left or left not in _ORDERED_KINDS:
+                    return False
+            else:
+                return False
+            left = right
+        return True
+
+    def _elements(self, node: ast.AST) -> set[str | None]:
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            if not node.elts:
+                return {None}
+            return {
+                _value_kind(item.value) if isinstance(item, ast.Constant) else None
+                for item in node.elts
+            }
+        if isinstance(node, ast.Name) and node.id in self._kwargs:
+            value = self._kwargs[node.id]
+            if isinstance(value, (list, tuple, set, frozenset)) and value:
+                return {_value_kind(item) for item in value}
+        return {None}
+
+    def kind(self, node: ast.AST) -> str | None:
+        """Kind of value of expression or None, if it is not supported"""
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in self._kwargs:
+                return _value_kind(self._kwargs[name])
+            if name in JobState.__members__:
+                return "state"
+            if name.endswith("_s") and name[:-2] in TIME_COLUMNS:
+                return "number"
+            return _COLUMN_KINDS.get(name)
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool):
+                return None
+            return _value_kind(node.value)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return "number" if self.kind(node.operand) == "number" else None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _DIVISION):
+            divisor = node.right
+            if not isinstance(divisor, ast.Constant) or not divisor.value:
+                return None
+        elif not isinstance(node, ast.BinOp) or not isinstance(node.op, _ARITHMETIC):
+            return None
+        operands = (self.kind(node.left), self.kind(node.right))
+        return "number" if operands == ("number", "number") else None
+
+
+def is_pandas_expression(expression: str, kwargs: dict, condition: bool) -> bool:
+    """
+    Returns True, if `where` condition (or sort expression, if `condition` is
+    False) can be evaluated over whole columns by `pandas.DataFrame.eval` with
+    the same result as evaluation for every record.
+    """
+    try:
+        body = ast.parse(expression.strip(), mode="eval").body
+    except SyntaxError:
+        return False
+    checker = _PandasChecker(kwargs)
+    if condition:
+        return checker.condition(body)
+    return checker.kind(body) is not None
+
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+class _ArrowTranslator:
+    """
+    Translates subset of python expressions to arrow compute expressions:
+    boolean operators over comparisons, comparisons of fields with values of
+    the same kind (see `_PandasChecker`), `in` with lists of constants. Kinds
+    of fields are taken from schema of dataset.
+    """
+
+    def __init__(self, schema: pa.Schema, kwargs: dict):
+        self._schema = schema
+        self._kwargs = kwargs
+
+    def condition(self, node: ast.AST) -> pc.Expression:
+        if isinstance(node, ast.BoolOp):
+            values = [self.condition(value) for value in node.values]
+            op = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+            result = values[0]
+            for value in values[1:]:
+                result = op(result, value)
+            return result
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            # comparison with missing value is null and row is dropped, that
+            # is the same as false, until it is negated
+            return ~pc.coalesce(self.condition(node.operand), pc.scalar(False))
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.Name):
+            value, kind = self._operand(node)
+            if kind == "boolean" and isinstance(value, pc.Expression):
+                return value
+        raise _Untranslatable
+
+    def _compare(self, node: ast.Compare) -> pc.Expression:
+        result = None
+        left, left_kind = self._operand(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                values = self._elements(comparator, left_kind)
+                if not isinstance(left, pc.Expression):
+                    raise _Untranslatable
+                term = left.isin(values)
+                if isinstance(op, ast.NotIn):
+                    term = ~term
+                right, right_kind = None, None
+            elif type(op) in _COMPARISONS:
+                right, right_kind = self._operand(comparator)
+                if left_kind is None or left_kind != right_kind:
+                    raise _Untranslatable
+                if not isinstance(op, (ast.Eq, ast.NotEq)):
+                    if left_kind not in _ORDERED_KINDS:
+                        raise _Untranslatable
+                if not any(isinstance(arg, pc.Expression) for arg in (left, right)):
+                    raise _Untranslatable
+                term = _COMPARISONS[type(op)](_scalar(left), _scalar(right))
+                if isinstance(op, ast.NotEq):
+                    # missing value is not equal to anything as in python
+                    term = pc.coalesce(term, pc.scalar(True))
+            else:
+                raise _Untranslatable
+            result = term if result is None else result & term
+            left, left_kind = right, right_kind
+        return result
+
+    def _operand(self, node: ast.AST) -> tuple[Any, str | None]:
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool):
+                raise _Untranslatable
+            return _arrow_value(node.value), _value_kind(node.value)
+        if not isinstance(node, ast.Name):
+            raise _Untranslatable
+        name = node.id
+        if name in self._kwargs:
+            value = self._kwargs[name]
+            return _arrow_value(value), _value_kind(value)
+        if name in JobState.__members__:
+            return name, "state"
+        if name in self._schema.names:
+            return pc.field(name), _field_kind(name, self._schema.field(name).type)
+        if name.endswith("_s") and name[:-2] in TIME_COLUMNS:
+            if name[:-2] in self._schema.names:
+                return pc.field(name[:-2]).cast(pa.int64()), "number"
+        raise _Untranslatable
+
+    def _elements(self, node: ast.AST, kind: str | None) -> list:
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            if not all(isinstance(item, ast.Constant) for item in node.elts):
+                raise _Untranslatable
+            values = [item.value for item in node.elts]
+        elif isinstance(node, ast.Name) and node.id in self._kwargs:
+            values = self._kwargs[node.id]
+            if not isinstance(values, (list, tuple, set, frozenset)):
+                raise _Untranslatable
+            values = list(values)
+        else:
+            raise _Untranslatable
+        if not values or kind is None:
+            raise _Untranslatable
+        if any(_value_kind(value) != kind for value in values):
+            raise _Untranslatable
+        return [_arrow_value(value) for value in values]
+
+
+def _field_kind(name: str, type: pa.DataType) -> str | None:
+    if pa.types.is_dictionary(type):
+        type = type.value_type
+    if name == "state":
+        return "state"
+    if pa.types.is_boolean(type):
+        return "boolean"
+    if pa.types.is_integer(type) or pa.types.is_floating(type):
+        return "number"
+    if pa.types.is_string(type) or pa.types.is_large_string(type):
+        return "string"
+    if pa.types.is_timestamp(type):
+        return "datetime"
+    if pa.types.is_duration(type):
+        return "timedelta"
+    return None
+
+
+def _arrow_value(value: Any) -> Any:
+    if isinstance(value, JobState):
+        return value.name
+    return value
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, pc.Expression):
+        return value
+    return pc.scalar(value)
+
+
+def to_arrow_expression(
+    condition: str, kwargs: dict, schema: pa.Schema | None = None
+) -> pc.Expression | None:
+    """
+    Translates `where` condition to boolean arrow compute expression over
+    columns of `schema` (job columns by default). Returns None, if condition
+    uses something besides boolean operators over comparisons of fields with
+    values of the same kind (e.g. truthiness of field, `None`, function
+    calls), then it must be evaluated for every record.
+    """
+    if schema is None:
+        schema = JOB_SCHEMA
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+        return _ArrowTranslator(schema, kwargs).condition(tree.body)
+    except (SyntaxError, TypeError, pa.ArrowException, _Untranslatable):
+        return None
+
+
+def to_sort_column(expression: str, columns: set[str] | None = None) -> str | None:
+    """
+    Returns name of column, if sort expression is a bare column name (`*_s`
+    properties are sorted by their time columns), otherwise None.
+    """
+    if columns is None:
+        columns = set(JOB_COLUMNS)
+    name = expression.strip()
+    if name.endswith("_s") and name[:-2] in TIME_COLUMNS:
+        name = name[:-2]
+    return name if name in columns else None
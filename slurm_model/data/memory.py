@@ -0,0 +1,120 @@
+"""
+This file defines writable in memory model of slurm db, e.g. for simulation
+of dispatching, where states of jobs change over time.
+"""
+
+from __future__ import annotations
+
+import operator
+from functools import reduce
+from typing import AbstractSet, Any, Callable, Iterable
+
+from .columnar import ColumnarJobOuterInfo
+from .expressions import compile_condition, compile_expression
+from .slurm_db import (
+    JobOuterInfo,
+    JobRecord,
+    JobState,
+    SimpleJobRecord,
+    SimpleSelectQuery,
+    SlurmDBModel,
+)
+
+try:
+    # compressed bitmaps of jobids, their unions and intersections are
+    # computed in C
+    from pyroaring import BitMap as _JobSet
+except ImportError:
+    _JobSet = set
+
+
+class RecordSelectQuery(SimpleSelectQuery[JobRecord]):
+    """
+    Query over records. Conditions are compiled to single predicate (see
+    `compile_condition`) and sort expressions are compiled once, then they are
+    evaluated for every record.
+    """
+
+    def __init__(self, records: Iterable[JobRecord]):
+        self._records = records
+        self._conditions: list[tuple[str, dict]] = []
+        self._orders: list[tuple[Callable[[JobRecord], Any], bool]] = []
+
+    def where(self, condition: str, **kwargs) -> RecordSelectQuery:
+        self._conditions.append((condition, kwargs))
+        return self
+
+    def order_by(
+        self, expression: str, descending: bool = False, **kwargs
+    ) -> RecordSelectQuery:
+        self._orders.append((compile_expression(expression, kwargs), descending))
+        return self
+
+    def execute(self) -> Iterable[JobRecord]:
+        records = list(self._records)
+        if self._conditions:
+            predicate = compile_condition(self._conditions, records)
+            records = [rec for rec in records if predicate(rec)]
+        # sorting is stable, so applying sorts from the last one gives
+        # lexicographical order
+        for key, descending in reversed(self._orders):
+            records.sort(key=key, reverse=descending)
+        return iter(records)
+
+
+class InMemorySlurmDBModel(SlurmDBModel):
+    """
+    Writable slurm db, that stores copies of job records in dict by jobid.
+
+    Model maintains index of running jobs by node: for every node set of
+    jobids, that are running on it (`pyroaring.BitMap`, if `pyroaring` is
+    installed, otherwise `set`), is updated, when job starts or stops running.
+    """
+
+    def __init__(self, records: Iterable[JobRecord] = ()):
+        self._jobs: dict[int, SimpleJobRecord] = {}
+        self._running_on: dict[str, AbstractSet[int]] = {}
+        for rec in records:
+            self.set_job(rec)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def set_job(self, rec: JobRecord):
+        old = self._jobs.get(rec.jobid)
+        if old is not None and old.state == JobState.RUNNING:
+            for node in old.nodes:
+                self._running_on[node].discard(old.jobid)
+        rec = SimpleJobRecord.from_record(rec)
+        if rec.state == JobState.RUNNING:
+            for node in rec.nodes:
+                running = self._running_on.get(node)
+                if running is None:
+                    running = self._running_on[node] = _JobSet()
+                running.add(rec.jobid)
+        self._jobs[rec.jobid] = rec
+
+    def jobs_running_on(self, nodes: Iterable[str]) -> AbstractSet[int]:
+        """
+        Returns set of ids of jobs, that are running on any of given nodes,
+        e.g. `len(db.jobs_running_on(job.nodes))` is number of jobs, that share
+        nodes with job. Returned set must not be modified.
+        """
+        running = [
+            self._running_on[node] for node in nodes if node in self._running_on
+        ]
+        if len(running) == 1:
+            return running[0]
+        return reduce(operator.or_, running, _JobSet())
+
+    def get_job(self, jobid: int) -> JobRecord | None:
+        return self._jobs.get(jobid)
+
+    def stream_jobs(self) -> Iterable[JobRecord]:
+        return iter(self._jobs.values())
+
+    def select_jobs(self) -> SimpleSelectQuery[JobRecord]:
+        return RecordSelectQuery(self._jobs.values())
+
+    def get_job_outer_info(self, jobid: int) -> JobOuterInfo:
+        return ColumnarJobOuterInfo(None)
@@ -7,9 +7,29 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from enum import Enum, auto
-from typing import Generic, TypeVar, Iterable
+from typing import Generic, TypeVar, Iterable, Protocol, runtime_checkable
 from datetime import datetime, timedelta
 
+import pandas as pd
+import pyarrow as pa
+
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def to_epoch_seconds(time: datetime) -> int:
+    """
+    Converts naive datetime to number of seconds since epoch, the same way as
+    `numpy.datetime64` does.
+    """
+    return (time - _EPOCH) // _SECOND
+
+
+def from_epoch_seconds(seconds: int) -> datetime:
+    """Inverse of `to_epoch_seconds`"""
+    return _EPOCH + timedelta(seconds=seconds)
+
 
 class JobState(Enum):
     """
@@ -33,7 +53,8 @@ class JobState(Enum):
     OOM = auto()
 
 
-class JobRecord(ABC):
+@runtime_checkable
+class JobRecord(Protocol):
     """
     Record representing some part of job record in slurmdb, that can be used by
     ML models.
@@ -43,8 +64,19 @@ class JobRecord(ABC):
 
     For reference see:
         https://github.com/SchedMD/slurm/blob/master/slurm/slurmdb.h#L835
+
+    This is a protocol, so any object with these attributes is a job record.
+    Properties are not required, plain attributes (see `SimpleJobRecord`) are
+    cheaper to access. Classes that explicitly subclass `JobRecord` must
+    implement all of them.
+
+    Records of this package also provide times in seconds (`elapsed_s`,
+    `end_s`, `start_s`, `submit_s` and `timelimit_s`), which are not part of
+    protocol, see `to_epoch_seconds`.
     """
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def alloc_nodes(self) -> int:
@@ -129,6 +161,98 @@ class JobRecord(ABC):
         """Id of user, that submitted job"""
 
 
+class SimpleJobRecord:
+    """Job record, that stores all fields as plain attributes"""
+
+    __slots__ = (
+        "alloc_nodes",
+        "elapsed",
+        "elapsed_s",
+        "end",
+        "end_s",
+        "exitcode",
+        "gid",
+        "jobid",
+        "jobname",
+        "nodes",
+        "partition",
+        "priority",
+        "req_cpus",
+        "start",
+        "start_s",
+        "state",
+        "submit",
+        "submit_s",
+        "timelimit",
+        "timelimit_s",
+        "uid",
+    )
+
+    def __init__(
+        self,
+        *,
+        alloc_nodes: int,
+        elapsed: timedelta,
+        end: datetime | None,
+        exitcode: int,
+        gid: str,
+        jobid: int,
+        jobname: str,
+        nodes: list[str],
+        partition: str,
+        priority: int,
+        req_cpus: int,
+        start: datetime | None,
+        state: JobState,
+        submit: datetime,
+        timelimit: timedelta,
+        uid: str,
+    ):
+        self.alloc_nodes = alloc_nodes
+        self.elapsed = elapsed
+        self.elapsed_s = elapsed // _SECOND
+        self.end = end
+        self.end_s = None if end is None else to_epoch_seconds(end)
+        self.exitcode = exitcode
+        self.gid = gid
+        self.jobid = jobid
+        self.jobname = jobname
+        self.nodes = nodes
+        self.partition = partition
+        self.priority = priority
+        self.req_cpus = req_cpus
+        self.start = start
+        self.start_s = None if start is None else to_epoch_seconds(start)
+        self.state = state
+        self.submit = submit
+        self.submit_s = to_epoch_seconds(submit)
+        self.timelimit = timelimit
+        self.timelimit_s = timelimit // _SECOND
+        self.uid = uid
+
+    @classmethod
+    def from_record(cls, rec: JobRecord) -> SimpleJobRecord:
+        """Copies fields of any job record"""
+        return cls(
+            alloc_nodes=rec.alloc_nodes,
+            elapsed=rec.elapsed,
+            end=rec.end,
+            exitcode=rec.exitcode,
+            gid=rec.gid,
+            jobid=rec.jobid,
+            jobname=rec.jobname,
+            nodes=list(rec.nodes),
+            partition=rec.partition,
+            priority=rec.priority,
+            req_cpus=rec.req_cpus,
+            start=rec.start,
+            state=rec.state,
+            submit=rec.submit,
+            timelimit=rec.timelimit,
+            uid=rec.uid,
+        )
+
+
 class JobOuterInfo(ABC):
     """Information that is not directly presented in slurm db, but may known"""
 
@@ -152,7 +276,7 @@ class SimpleSelectQuery(Generic[RecordType], ABC):
         """
         General filtering condition, that can be `eval`-ed with all the
         properties of record being injected into namespace. All the kwargs is also
-        injected.
+        injected, as well as members of `JobState` by their names.
 
         Engine will try its best to optimize this filter, but in worst case it
         will evaluate this condition for every row and leave only ones, those
@@ -181,6 +305,19 @@ class SimpleSelectQuery(Generic[RecordType], ABC):
     def execute(self) -> Iterable[RecordType]:
         """Stream results of query"""
 
+    def execute_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        """
+        Stream results of query of job records as arrow record batches of at
+        most `batch_size` rows, see `slurm_model.data.columnar.JOB_COLUMNS`
+        for columns.
+
+        Default implementation groups records of `execute`, backends that
+        store jobs column-wise should override it.
+        """
+        from .columnar import records_to_batches
+
+        return records_to_batches(self.execute(), batch_size)
+
 
 class ReadOnlySlurmDBModel(ABC):
     """
@@ -201,6 +338,33 @@ class ReadOnlySlurmDBModel(ABC):
         If write operation occurs while this operation, result is undefined.
         """
 
+    def stream_jobs_columnar(self) -> pd.DataFrame:
+        """
+        Returns all jobs in job db as `pandas.DataFrame` with one column per
+        `JobRecord` property, see `slurm_model.data.columnar.JOB_COLUMNS` for
+        column dtypes. Returned frame must not be modified.
+
+        Default implementation materializes `stream_jobs`, backends that store
+        jobs column-wise should override it.
+        """
+        from .columnar import jobs_to_frame
+
+        return jobs_to_frame(self.stream_jobs())
+
+    def stream_jobs_batches(self, batch_size: int = 65536) -> Iterable[pa.RecordBatch]:
+        """
+        Yields all jobs in job db as arrow record batches of at most
+        `batch_size` rows, see `slurm_model.data.columnar.JOB_COLUMNS` for
+        columns. Use `slurm_model.data.columnar.batch_records` to get records
+        of batch.
+
+        Default implementation groups records of `stream_jobs`, backends that
+        store jobs column-wise should override it.
+        """
+        from .columnar import records_to_batches
+
+        return records_to_batches(self.stream_jobs(), batch_size)
+
     @abstractmethod
     def select_jobs(self) -> SimpleSelectQuery[JobRecord]:
         """Returns query builder for selecting jobs"""
@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
 from datetime import timedelta
-from typing import TypeAlias
+from typing import Callable, Iterable, TypeAlias
 import numpy as np
 import pandas as pd
 
-from slurm_model.data import ReadOnlySlurmDBModel, JobRecord
+from slurm_model.data import (
+    JOB_COLUMNS,
+    ColumnarSlurmDBModel,
+    ReadOnlySlurmDBModel,
+    JobRecord,
+    as_submitted,
+)
+from slurm_model.runtime_estimation.features import FeatureCache
 
 
 class RuntimeEstimator(ABC):
@@ -19,6 +26,21 @@ class RuntimeEstimator(ABC):
         engeneering.
         """
 
+    def estimate_batch(
+        self, jobs: Iterable[JobRecord], db: ReadOnlySlurmDBModel
+    ) -> np.ndarray:
+        """
+        Predicts runtimes of given jobs (e.g. all pending jobs), returns array
+        of `numpy.timedelta64`.
+
+        Default implementation calls `estimate` for every job, estimators
+        should override it, if they can process jobs at once. Runtimes are
+        rounded to seconds as by `StatelessRuntimeEstimator.y_to_timedelta`.
+        """
+        seconds = [self.estimate(job, db).total_seconds() for job in jobs]
+        seconds = np.array(seconds, dtype=np.float64).round()
+        return seconds.astype(np.int64).astype("timedelta64[s]")
+
 
 JobFeatures: TypeAlias = np.ndarray | pd.DataFrame
 JobTarget: TypeAlias = np.ndarray | float
@@ -39,51 +61,250 @@ class StatelessRuntimeEstimator(ABC):
 
     General algorithm for creating dataset (X, y) for class `cls` then would be:
         create empty db
-        create list of features
-        create list of targets
-        for each record in real data sorted by submit time:
+        X := empty matrix of shape (number of records, `cls.FEATURE_COUNT`)
+        y := empty vector of shape (number of records,)
+        for i, record in enumerate(real data sorted by submit time):
             make job record from row as if it was just submitted
             get real elapsed time from row
-            append `cls.extract_features(job record, db)` to features list
-            append `cls.timedelta_to_y(elapsed time)` to target list
-            make full job record frow row and insert it into db
-        X := concatination of features list
-        y := concatination of targets list
+            call `cls.extract_features(job record, db, out=X[i], cache)`
+            y[i] := `cls.timedelta_to_y(elapsed time)`
+            make full job record frow row and insert it into db and cache
+
+    This algorithm is implemented by `make_dataset` class method. Instead of
+    inserting records into db one by one, every job is given a view of history,
+    that contains only jobs submitted before it. Features for the whole history
+    are extracted by single `extract_features_batch` call, that can be
+    overridden with vectorised implementation.
+
+    General algorith of inference is implemented in `estimate` method, many
+    jobs are estimated at once by `estimate_batch`.
 
-    General algorith of inference is implemented in `estimate` method.
+    Per-job numerical part of features can be defined by `feature_kernel`,
+    that is compiled by `_compile_feature_kernel` to function, which is
+    applied to matrix of all jobs at once.
+    """
+
+    FEATURE_COUNT: int | None = None
+    """
+    Number of features of a job. If it is not declared, it is inferred from
+    features of the first job.
+    """
+
+    FEATURE_DTYPE: type = np.float32
+    """
+    Dtype of feature matrices. Single precision is enough for features derived
+    from job records and halves memory traffic of dataset and `predict`.
     """
 
     @classmethod
     @abstractmethod
-    def extract_features(cls, job: JobRecord, db: ReadOnlySlurmDBModel) -> JobFeatures:
+    def extract_features(
+        cls,
+        job: JobRecord,
+        db: ReadOnlySlurmDBModel,
+        out: np.ndarray | None = None,
+        cache: FeatureCache | None = None,
+    ) -> JobFeatures:
         """
         This method extracts all needed features for given job and db state.
+        If `out` is given, features are written to this vector of length
+        `FEATURE_COUNT` and `FEATURE_DTYPE`, which is then returned. `out` is
+        passed only to subclasses, which declare `FEATURE_COUNT`.
+
+        If `cache` is given, it holds statistics of every job in db, so history
+        aggregates can be read from it instead of scanning db. It is passed
+        only by subclasses, which define `make_feature_cache`.
 
         This method will be used for inference and should be used for creating
         intermediate train or test datasets.
         """
 
+    @classmethod
+    def extract_features_batch(
+        cls, jobs: pd.DataFrame, history: pd.DataFrame
+    ) -> np.ndarray:
+        """
+        This method extracts features for every job in `jobs`, for each job
+        only jobs from `history`, that were submitted strictly before it, are
+        visible. Both frames have columns described in
+        `slurm_model.data.JOB_COLUMNS`, jobs must be represented as if they
+        were just submitted (see `slurm_model.data.as_submitted`).
+
+        Returns matrix of `FEATURE_DTYPE`, which rows are features of
+        corresponding jobs.
+
+        Default implementation calls `extract_features` for every job. If
+        `make_feature_cache` returns cache, jobs are processed in submit order
+        and every history job is added to cache before jobs, that see it.
+        Subclasses should override it with vectorised implementation, history
+        aggregates (e.g. number of jobs user submitted before or their mean
+        elapsed time) can be computed for all jobs at once with functions from
+        `slurm_model.runtime_estimation.features`.
+        """
+        db = ColumnarSlurmDBModel(history.sort_values("submit", kind="stable"))
+        submitted = ColumnarSlurmDBModel(jobs)
+        visible = np.searchsorted(
+            db.stream_jobs_columnar()["submit"].to_numpy(),
+            submitted.stream_jobs_columnar()["submit"].to_numpy(),
+            side="left",
+        )
+        records = list(submitted.stream_jobs())
+        cache = cls.make_feature_cache()
+        if cache is None:
+            order = range(len(records))
+            kwargs = {}
+        else:
+            # history is added to cache in submit order, so jobs are
+            # processed in the same order
+            order = np.argsort(visible, kind="stable")
+            kwargs = {"cache": cache}
+            history_records = db.stream_jobs()
+            added = 0
+        X = None
+        # without declared width features are not written in place, so
+        # estimators, which `extract_features` has no `out`, keep working
+        if cls.FEATURE_COUNT is not None:
+            X = np.empty((len(records), cls.FEATURE_COUNT), dtype=cls.FEATURE_DTYPE)
+            kwargs["out"] = None
+        for row in order:
+            n = visible[row]
+            if cache is not None:
+                for _ in range(added, n):
+                    cache.add(next(history_records))
+                added = max(added, n)
+            if "out" in kwargs:
+                kwargs["out"] = X[row]
+            x = cls.extract_features(records[row], db.head(n), **kwargs)
+            if X is None:
+                x = np.ravel(x)
+                X = np.empty((len(records), x.size), dtype=cls.FEATURE_DTYPE)
+            if x is not kwargs.get("out"):
+                X[row] = np.ravel(x)
+        if X is None:
+            return np.empty((0, cls.FEATURE_COUNT or 0), dtype=cls.FEATURE_DTYPE)
+        return X
+
+    @classmethod
+    def make_feature_cache(cls) -> FeatureCache | None:
+        """
+        Creates cache, that is passed to `extract_features` by
+        `extract_features_batch`, e.g. `FeatureCache(by=("uid",))`. By default
+        cache is not used.
+        """
+        return None
+
+    @classmethod
+    def make_dataset(cls, history: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """
+        This method materializes dataset (X, y) from history of finished jobs,
+        that is frame with columns described in `slurm_model.data.JOB_COLUMNS`.
+        Rows of dataset are ordered by submit time.
+        """
+        history = history.astype(JOB_COLUMNS)
+        history = history.sort_values("submit", kind="stable", ignore_index=True)
+        X = cls.extract_features_batch(as_submitted(history), history)
+        y = cls.timedelta_to_y(history["elapsed"].to_numpy())
+        return X, y
+
+    feature_kernel: Callable[[np.ndarray, np.ndarray], None] | None = None
+    """
+    Optional kernel, that computes features of a single job from its numeric
+    row and writes them to `out`, declared as `staticmethod` with signature
+    `(row, out)`. Kernel must be compilable by `numba.njit`, i.e. use only
+    numpy operations and plain loops.
+    """
+
+    @classmethod
+    def _compile_feature_kernel(
+        cls, n_features: int
+    ) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Compiles `feature_kernel` to parallel numpy gufunc with numba. Returned
+        function maps matrix with a row per job (e.g. `.values` of numeric job
+        snapshot) to (N, n_features) matrix of `FEATURE_DTYPE`. Input is
+        converted to float64, so epoch seconds do not lose precision.
+
+        Compiled kernels are cached per class. Requires optional `numba`
+        dependency. Raises `TypeError`, if class does not define kernel.
+        """
+        if cls.feature_kernel is None:
+            raise TypeError(
+                f"{cls.__name__} does not define `feature_kernel` to compile"
+            )
+        kernels = cls.__dict__.get("_compiled_feature_kernels")
+        if kernels is None:
+            kernels = {}
+            setattr(cls, "_compiled_feature_kernels", kernels)
+        if n_features not in kernels:
+            from numba import guvectorize, njit
+
+            kernel = njit(cls.feature_kernel)
+            dtype = np.dtype(cls.FEATURE_DTYPE)
+
+            # numba requires every output dimension to be present in inputs,
+            # so number of features is passed with template array
+            @guvectorize(
+                [f"void(float64[:], {dtype.name}[:], {dtype.name}[:])"],
+                "(n),(m)->(m)",
+                nopython=True,
+                target="parallel",
+            )
+            def gufunc(row, template, out):
+                kernel(row, out)
+
+            template = np.empty(n_features, dtype=dtype)
+            kernels[n_features] = lambda values: gufunc(
+                np.ascontiguousarray(values, dtype=np.float64), template
+            )
+        return kernels[n_features]
+
     @abstractmethod
     def predict(self, X: JobFeatures) -> JobTarget:
         """This method implements model logic"""
 
     @classmethod
-    def timedelta_to_y(cls, runtime: timedelta) -> JobTarget:
+    def timedelta_to_y(cls, runtime: timedelta | np.ndarray) -> JobTarget:
         """
         This method defines conversion from timedelta to model specific target
-        representation.
+        representation. Runtime can also be array of `numpy.timedelta64`, then
+        array of targets is returned.
         """
+        if isinstance(runtime, np.ndarray):
+            return runtime.astype("timedelta64[s]").view("i8").astype(np.float64)
         return runtime.total_seconds()
 
     @classmethod
-    def y_to_timedelta(cls, prediction: JobTarget) -> timedelta:
+    def y_to_timedelta(cls, prediction: JobTarget) -> timedelta | np.ndarray:
         """
         This method defines conversion from model specific target
-        representation to timedelta.
+        representation to timedelta. If prediction is an array, array of
+        `numpy.timedelta64` with seconds resolution is returned.
         """
-        return timedelta(seconds=prediction)
+        if isinstance(prediction, np.ndarray):
+            return prediction.round().astype(np.int64).astype("timedelta64[s]")
+        return timedelta(seconds=float(prediction))
 
     def estimate(self, job: JobRecord, db: ReadOnlySlurmDBModel) -> timedelta:
         x = self.extract_features(job, db)
         y = self.predict(x)
+        runtime = self.y_to_timedelta(y)
+        if isinstance(runtime, (np.ndarray, np.generic)):
+            # model returned batch of single prediction
+            runtime = runtime.item()
+        return runtime
+
+    def estimate_batch(
+        self, jobs: Iterable[JobRecord], db: ReadOnlySlurmDBModel
+    ) -> np.ndarray:
+        """
+        Predicts runtimes of given jobs, returns array of `numpy.timedelta64`.
+        Result is the same as of `estimate` for every job: features of each job
+        are extracted with current state of db, then matrix of features of all
+        jobs is passed to single `predict` call.
+        """
+        features = [np.ravel(self.extract_features(job, db)) for job in jobs]
+        if not features:
+            return np.empty(0, dtype="timedelta64[s]")
+        X = np.stack(features).astype(self.FEATURE_DTYPE, copy=False)
+        y = np.asarray(self.predict(X))
         return self.y_to_timedelta(y)
@@ -0,0 +1,219 @@
+"""
+This file defines vectorised building blocks for `extract_features_batch`.
+
+Every function takes `jobs` and `history` frames with columns described in
+`slurm_model.data.JOB_COLUMNS` and computes aggregate over jobs from history,
+that were submitted strictly before each job, i.e. over the state of db, that
+job would see at its submit time. Aggregates are computed as cumulative
+group-by over submit-sorted history, that is joined back to jobs, so history
+is scanned only once.
+
+For per-job `extract_features` the same aggregates can be maintained
+incrementally with `FeatureCache`.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from slurm_model.data import JobRecord, to_epoch_seconds
+from slurm_model.data.columnar import STATE_DTYPE
+
+
+def _seconds(column: pd.Series) -> np.ndarray:
+    values = column.to_numpy()
+    if values.dtype.kind == "m":
+        return values.astype("timedelta64[s]").view("i8")
+    return values.astype("datetime64[s]").view("i8")
+
+
+def _numeric(column: pd.Series) -> np.ndarray:
+    """Values of column as float64, time columns in seconds, missing as NaN"""
+    if column.dtype.kind in "mM":
+        seconds = _seconds(column).astype(np.float64)
+        seconds[np.isnat(column.to_numpy())] = np.nan
+        return seconds
+    return column.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _group_keys(
+    jobs: pd.DataFrame, history: pd.DataFrame, by: str | None
+) -> tuple[np.ndarray, np.ndarray]:
+    if by is None:
+        return np.zeros(len(jobs), np.int64), np.zeros(len(history), np.int64)
+    values = np.concatenate(
+        [jobs[by].to_numpy(dtype=object), history[by].to_numpy(dtype=object)]
+    )
+    codes, _ = pd.factorize(values)
+    return codes[: len(jobs)], codes[len(jobs) :]
+
+
+def _cumulative(
+    jobs: pd.DataFrame,
+    history: pd.DataFrame,
+    by: str | None,
+    values: dict[str, np.ndarray],
+) -> pd.DataFrame:
+    """
+    For every job returns sums of given history values over history jobs with
+    the same `by` value submitted before it. Rows are in order of `jobs`.
+    """
+    job_keys, history_keys = _group_keys(jobs, history, by)
+    right = pd.DataFrame(
+        {"submit": _seconds(history["submit"]), "key": history_keys, **values}
+    )
+    right = right.sort_values("submit", kind="stable", ignore_index=True)
+    right[list(values)] = right.groupby("key", sort=False)[list(values)].cumsum()
+    left = pd.DataFrame(
+        {
+            "submit": _seconds(jobs["submit"]),
+            "key": job_keys,
+            "row": np.arange(len(jobs)),
+        }
+    )
+    left = left.sort_values("submit", kind="stable", ignore_index=True)
+    merged = pd.merge_asof(
+        left, right, on="submit", by="key", allow_exact_matches=False
+    )
+    merged = merged.sort_values("row", ignore_index=True)
+    return merged[list(values)].fillna(0.0)
+
+
+def running_count(
+    jobs: pd.DataFrame, history: pd.DataFrame, by: str | None = None
+) -> np.ndarray:
+    """
+    Number of history jobs with the same `by` value (e.g. "uid"), submitted
+    before each job. If `by` is None, all history jobs are counted.
+    """
+    ones = np.ones(len(history), dtype=np.float64)
+    return _cumulative(jobs, history, by, {"count": ones})["count"].to_numpy()
+
+
+def running_sum(
+    jobs: pd.DataFrame, history: pd.DataFrame, column: str, by: str | None = None
+) -> np.ndarray:
+    """
+    Sum of `column` over history jobs with the same `by` value, submitted
+    before each job. Time columns are summed in seconds, missing values (e.g.
+    `end` of pending jobs) are skipped.
+    """
+    values = {"sum": np.nan_to_num(_numeric(history[column]), nan=0.0)}
+    return _cumulative(jobs, history, by, values)["sum"].to_numpy()
+
+
+def running_mean(
+    jobs: pd.DataFrame, history: pd.DataFrame, column: str, by: str | None = None
+) -> np.ndarray:
+    """
+    Mean of `column` over history jobs with the same `by` value, submitted
+    before each job, or NaN if there are no such jobs. Time columns are
+    averaged in seconds, missing values are skipped as by `FeatureCache`.
+
+    For training, where jobs are history itself, this is the same as shifted
+    expanding mean of submit-sorted history grouped by `by`, except that jobs
+    submitted at the same time do not see each other.
+    """
+    numeric = _numeric(history[column])
+    missing = np.isnan(numeric)
+    values = {
+        "count": (~missing).astype(np.float64),
+        "sum": np.where(missing, 0.0, numeric),
+    }
+    sums = _cumulative(jobs, history, by, values)
+    return (sums["sum"] / sums["count"]).to_numpy()
+
+
+def running_state_count(
+    jobs: pd.DataFrame, history: pd.DataFrame, mask: np.ndarray, by: str | None = None
+) -> np.ndarray:
+    """
+    Number of history jobs with the same `by` value, submitted before each job,
+    which state is in `mask` (see `slurm_model.data.columnar.state_mask`), e.g.
+    number of failed jobs of user is
+    `running_state_count(jobs, history, FAILURE_MASK, "uid")`.
+    """
+    codes = history["state"].astype(STATE_DTYPE).cat.codes.to_numpy()
+    hits = mask[codes].astype(np.float64)
+    return _cumulative(jobs, history, by, {"count": hits})["count"].to_numpy()
+
+
+class RunningStats:
+    """
+    Count, mean and variance of stream of values, updated in O(1) per value
+    with Welford's algorithm.
+    """
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = math.nan
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if self.count == 1:
+            self.mean = float(value)
+            return
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, NaN if there are less than two values"""
+        if self.count < 2:
+            return math.nan
+        return self._m2 / (self.count - 1)
+
+
+class FeatureCache:
+    """
+    Running statistics of `column` of history jobs grouped by each of `by`
+    fields, that are updated incrementally as jobs are added to history.
+
+    This is scalar counterpart of `running_mean` and others for per-job
+    `extract_features`: instead of scanning db for every job, training loop
+    adds every history job to cache once (see
+    `StatelessRuntimeEstimator.make_feature_cache`), so features are read from
+    cache in O(1).
+    """
+
+    def __init__(
+        self, by: tuple[str, ...] = ("uid", "partition"), column: str = "elapsed"
+    ):
+        self.column = column
+        self.total = RunningStats()
+        self.groups: dict[str, dict[Any, RunningStats]] = {name: {} for name in by}
+
+    def add(self, job: JobRecord) -> None:
+        """Adds finished job to statistics, time fields are added in seconds"""
+        value = getattr(job, self.column)
+        if value is None:
+            return
+        if isinstance(value, datetime):
+            value = to_epoch_seconds(value)
+        elif isinstance(value, timedelta):
+            value = value.total_seconds()
+        self.total.add(value)
+        for name, groups in self.groups.items():
+            key = getattr(job, name)
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = RunningStats()
+            stats.add(value)
+
+    def get(self, by: str, key: Any) -> RunningStats:
+        """
+        Statistics of jobs, which `by` field is equal to `key`, e.g.
+        `cache.get("uid", job.uid).mean`. Empty statistics are returned for
+        unseen keys.
+        """
+        stats = self.groups[by].get(key)
+        return RunningStats() if stats is None else stats
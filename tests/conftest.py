@@ -0,0 +1,33 @@
+import pyarrow.parquet as pq
+import pytest
+
+from slurm_model.data import (
+    ArrowSlurmDBModel,
+    ColumnarSlurmDBModel,
+    InMemorySlurmDBModel,
+    ParquetSlurmDBModel,
+    SimpleJobRecord,
+)
+from slurm_model.data.columnar import frame_to_arrow
+
+from tests.helpers import make_jobs
+
+
+@pytest.fixture
+def jobs() -> list[SimpleJobRecord]:
+    return make_jobs()
+
+
+@pytest.fixture(params=["columnar", "arrow", "parquet", "memory"])
+def db(request, jobs, tmp_path):
+    columnar = ColumnarSlurmDBModel.from_records(jobs)
+    if request.param == "columnar":
+        return columnar
+    if request.param == "memory":
+        return InMemorySlurmDBModel(jobs)
+    table = frame_to_arrow(columnar.stream_jobs_columnar())
+    if request.param == "arrow":
+        return ArrowSlurmDBModel(table)
+    path = tmp_path / "jobs.parquet"
+    pq.write_table(table, path, row_group_size=16)
+    return ParquetSlurmDBModel(path)
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+import random
+
+from slurm_model.data import JobState, SimpleJobRecord
+
+
+def make_jobs(n: int = 40, seed: int = 0) -> list[SimpleJobRecord]:
+    """
+    Jobs with ties in submit time and priority, every second job is not
+    started, exit codes alternate between 0 and 1.
+    """
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n):
+        submit = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(n // 2))
+        started = i % 2 == 1
+        elapsed = timedelta(seconds=rng.randrange(1, 5000))
+        start = submit + timedelta(seconds=rng.randrange(100)) if started else None
+        if not started:
+            state = JobState.PENDING
+        else:
+            state = rng.choice([JobState.RUNNING, JobState.COMPLETE, JobState.FAILED])
+        jobs.append(
+            SimpleJobRecord(
+                alloc_nodes=rng.randrange(1, 4),
+                elapsed=elapsed if started else timedelta(0),
+                end=start + elapsed if started else None,
+                exitcode=i % 2,
+                gid=rng.choice(["g1", "g2"]),
+                jobid=100 + i,
+                jobname=f"job{i % 3}",
+                nodes=rng.sample(["n1", "n2", "n3", "n4"], 2) if started else [],
+                partition=rng.choice(["cpu", "gpu"]),
+                priority=rng.randrange(5),
+                req_cpus=rng.randrange(1, 64),
+                start=start,
+                state=state,
+                submit=submit,
+                timelimit=timedelta(hours=2),
+                uid=rng.choice(["u1", "u2", "u3"]),
+            )
+        )
+    return jobs
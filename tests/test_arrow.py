@@ -0,0 +1,29 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from slurm_model.data import JOB_COLUMNS, ColumnarSlurmDBModel, ParquetSlurmDBModel
+from slurm_model.data.columnar import frame_to_arrow
+
+
+@pytest.fixture
+def path(jobs, tmp_path):
+    frame = ColumnarSlurmDBModel.from_records(jobs).stream_jobs_columnar()
+    table = frame_to_arrow(frame)
+    table = table.append_column(
+        "field", pa.array([f"field{job.jobid % 3}" for job in jobs])
+    )
+    path = tmp_path / "jobs.parquet"
+    pq.write_table(table, path, row_group_size=16)
+    return path
+
+
+def test_parquet_get_job(jobs, path):
+    db = ParquetSlurmDBModel(path)
+    for job in jobs:
+        found = db.get_job(job.jobid)
+        for name in JOB_COLUMNS:
+            assert getattr(found, name) == getattr(job, name), name
+        assert db.get_job_outer_info(job.jobid).field == f"field{job.jobid % 3}"
+    assert db.get_job(-1) is None
+    assert db.get_job_outer_info(-1).field is None
@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+
+from slurm_model.data import (
+    ACTIVE_MASK,
+    FAILURE_MASK,
+    TERMINAL_MASK,
+    ColumnarSlurmDBModel,
+    InMemorySlurmDBModel,
+    JobState,
+    state_mask,
+)
+
+from tests.helpers import make_jobs
+
+SORT_COLUMNS = ["submit", "end", "end_s", "priority", "uid", "state", "elapsed"]
+
+
+@pytest.fixture
+def model() -> ColumnarSlurmDBModel:
+    return ColumnarSlurmDBModel.from_records(make_jobs(60, seed=1))
+
+
+def _expected(frame: pd.DataFrame, name: str, descending: bool) -> list[int]:
+    # `*_s` properties are sorted as their time columns, missing values last
+    column = name.removesuffix("_s")
+    frame = frame.sort_values(
+        column, ascending=not descending, kind="stable", na_position="last"
+    )
+    return frame["jobid"].tolist()
+
+
+@pytest.mark.parametrize("name", SORT_COLUMNS)
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("n", [None, 25])
+def test_cached_sort_order(model, name, descending, n):
+    db = model if n is None else model.head(n)
+    frame = model.stream_jobs_columnar().iloc[: len(db)]
+    query = db.select_jobs().order_by(name, descending=descending)
+    result = [rec.jobid for rec in query.execute()]
+    assert result == _expected(frame, name, descending)
+    # the second query reuses permutation cached by the first one
+    assert [rec.jobid for rec in query.execute()] == result
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_cached_sort_order_with_filter(model, descending):
+    db = model.head(40)
+    frame = model.stream_jobs_columnar().iloc[:40]
+    frame = frame[frame["req_cpus"] > 20]
+    query = db.select_jobs().where("req_cpus > 20").order_by("end", descending)
+    expected = _expected(frame, "end", descending)
+    assert [rec.jobid for rec in query.execute()] == expected
+
+
+def test_head_shares_sort_order(model):
+    model.select_jobs().order_by("priority").execute()
+    head = model.head(10)
+    query = head.select_jobs().order_by("priority")
+    expected = _expected(model.stream_jobs_columnar().iloc[:10], "priority", False)
+    assert [rec.jobid for rec in query.execute()] == expected
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("orders", [["partition"], ["uid"], ["partition", "jobid"]])
+def test_pinned_categories_sort_by_value(jobs, orders, descending):
+    # pinned categories are not in order of values
+    categories = {"partition": ["gpu", "cpu"], "uid": ["u3", "u1", "u2"]}
+    pinned = ColumnarSlurmDBModel.from_records(jobs, categories)
+    expected = sorted(
+        jobs,
+        key=lambda job: tuple(getattr(job, name) for name in orders),
+        reverse=descending,
+    )
+    for db in (pinned, InMemorySlurmDBModel(jobs)):
+        query = db.select_jobs()
+        for expression in orders:
+            query = query.order_by(expression, descending=descending)
+        assert [rec.jobid for rec in query.execute()] == [
+            job.jobid for job in expected
+        ]
+
+
+def test_node_codes(model):
+    jobs = make_jobs(60, seed=1)
+    for job, view in zip(jobs, model.stream_jobs()):
+        assert view.nodes == job.nodes
+        assert model.node_names[view.node_codes].tolist() == job.nodes
+
+
+@pytest.mark.parametrize("nodes", [["n1"], ["n2", "n4"], ["unknown"], []])
+@pytest.mark.parametrize("n", [None, 25])
+def test_jobs_on_nodes(model, nodes, n):
+    db = model if n is None else model.head(n)
+    jobs = make_jobs(60, seed=1)[: len(db)]
+    expected = [bool(set(nodes) & set(job.nodes)) for job in jobs]
+    assert db.jobs_on_nodes(nodes).tolist() == expected
+
+
+def test_state_masks(model):
+    frame = model.stream_jobs_columnar()
+    codes = frame["state"].cat.codes.to_numpy()
+    states = [JobState[name] for name in frame["state"]]
+    active = {JobState.PENDING, JobState.RUNNING, JobState.SUSPENDED}
+    assert ACTIVE_MASK[codes].tolist() == [state in active for state in states]
+    assert TERMINAL_MASK[codes].tolist() == [state not in active for state in states]
+    mask = state_mask(JobState.RUNNING, JobState.FAILED)
+    assert mask[codes].tolist() == [
+        state in (JobState.RUNNING, JobState.FAILED) for state in states
+    ]
+    # missing state
+    for mask in (ACTIVE_MASK, TERMINAL_MASK, FAILURE_MASK):
+        assert not mask[-1]
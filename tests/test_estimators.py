@@ -0,0 +1,210 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from slurm_model.data import ColumnarSlurmDBModel, as_submitted, jobs_to_frame
+from slurm_model.runtime_estimation.base import (
+    RuntimeEstimator,
+    StatelessRuntimeEstimator,
+)
+from slurm_model.runtime_estimation.features import (
+    FeatureCache,
+    running_count,
+    running_mean,
+)
+
+from tests.helpers import make_jobs
+
+
+class CpuEstimator(StatelessRuntimeEstimator):
+    """Runtime is linear in requested cpus and number of user's jobs"""
+
+    @classmethod
+    def extract_features(cls, job, db, out=None, cache=None):
+        seen = db.select_jobs().where("uid == u", u=job.uid).execute()
+        x = np.array([job.req_cpus, len(list(seen))], dtype=np.float64)
+        if out is None:
+            return x
+        out[:] = x
+        return out
+
+    def predict(self, X):
+        return X[..., 0] * 60.5 + X[..., 1]
+
+
+class ConstantEstimator(RuntimeEstimator):
+    def __init__(self, runtime: timedelta):
+        self.runtime = runtime
+
+    def estimate(self, job, db):
+        return self.runtime
+
+
+def test_estimate_batch_is_estimate_of_every_job():
+    history = jobs_to_frame(make_jobs(40, seed=4))
+    db = ColumnarSlurmDBModel(history)
+    jobs = list(ColumnarSlurmDBModel(as_submitted(history)).stream_jobs())
+    estimator = CpuEstimator()
+    runtimes = estimator.estimate_batch(jobs, db)
+    assert runtimes.dtype == np.dtype("timedelta64[s]")
+    # batch has seconds resolution
+    expected = [estimator.estimate(job, db).total_seconds() for job in jobs]
+    assert runtimes.tolist() == [timedelta(seconds=round(y)) for y in expected]
+    assert len(estimator.estimate_batch([], db)) == 0
+
+
+def test_default_estimate_batch_rounds():
+    jobs = make_jobs(3)
+    db = ColumnarSlurmDBModel.from_records(jobs)
+    runtimes = ConstantEstimator(timedelta(seconds=1.6)).estimate_batch(jobs, db)
+    assert runtimes.tolist() == [timedelta(seconds=2)] * 3
+    y = np.array([1.6])
+    assert runtimes[0] == StatelessRuntimeEstimator.y_to_timedelta(y)[0]
+
+
+def test_estimate_batch_predicts_feature_dtype():
+    class Recording(CpuEstimator):
+        def predict(self, X):
+            self.dtype = X.dtype
+            return super().predict(X)
+
+    jobs = make_jobs(5)
+    estimator = Recording()
+    estimator.estimate_batch(jobs, ColumnarSlurmDBModel.from_records(jobs))
+    assert estimator.dtype == CpuEstimator.FEATURE_DTYPE
+
+
+class KernelEstimator(CpuEstimator):
+    @staticmethod
+    def feature_kernel(row, out):
+        out[0] = row[0] * 2.0
+        out[1] = row[0] + row[1]
+        out[2] = 0.0
+
+
+def test_compile_feature_kernel():
+    pytest.importorskip("numba")
+    kernel = KernelEstimator._compile_feature_kernel(3)
+    assert KernelEstimator._compile_feature_kernel(3) is kernel
+    values = np.array([[1, 2], [3, 4], [5, 6]], dtype=np.int64)
+    X = kernel(values)
+    assert X.dtype == KernelEstimator.FEATURE_DTYPE
+    np.testing.assert_array_equal(X, [[2, 3, 0], [6, 7, 0], [10, 11, 0]])
+
+
+def test_compile_without_feature_kernel():
+    with pytest.raises(TypeError):
+        CpuEstimator._compile_feature_kernel(3)
+
+
+class VectorisedCpuEstimator(CpuEstimator):
+    @classmethod
+    def extract_features_batch(cls, jobs, history):
+        X = np.empty((len(jobs), 2), dtype=cls.FEATURE_DTYPE)
+        X[:, 0] = jobs["req_cpus"].to_numpy()
+        X[:, 1] = running_count(jobs, history, "uid")
+        return X
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    return jobs_to_frame(make_jobs(60, seed=5))
+
+
+def test_make_dataset(history):
+    X, y = CpuEstimator.make_dataset(history)
+    history = history.sort_values("submit", kind="stable", ignore_index=True)
+    np.testing.assert_array_equal(X[:, 0], history["req_cpus"])
+    np.testing.assert_array_equal(
+        X[:, 1], running_count(as_submitted(history), history, "uid")
+    )
+    np.testing.assert_array_equal(y, history["elapsed"].dt.total_seconds())
+    X_batch, y_batch = VectorisedCpuEstimator.make_dataset(history)
+    np.testing.assert_array_equal(X_batch, X)
+    np.testing.assert_array_equal(y_batch, y)
+
+
+class DeclaredCpuEstimator(CpuEstimator):
+    FEATURE_COUNT = 2
+    rows: list[np.ndarray] = []
+
+    @classmethod
+    def extract_features(cls, job, db, out=None, cache=None):
+        cls.rows.append(out)
+        return super().extract_features(job, db, out, cache)
+
+
+class LegacyCpuEstimator(CpuEstimator):
+    @classmethod
+    def extract_features(cls, job, db):
+        return super().extract_features(job, db)
+
+
+def test_make_dataset_writes_declared_features_in_place(history):
+    X, _ = CpuEstimator.make_dataset(history)
+    DeclaredCpuEstimator.rows = []
+    X_declared, _ = DeclaredCpuEstimator.make_dataset(history)
+    np.testing.assert_array_equal(X_declared, X)
+    # every job wrote its own row of preallocated matrix
+    assert len(DeclaredCpuEstimator.rows) == len(history)
+    assert all(np.shares_memory(row, X_declared) for row in DeclaredCpuEstimator.rows)
+    # estimators without `out` still get features returned
+    X_legacy, _ = LegacyCpuEstimator.make_dataset(history)
+    np.testing.assert_array_equal(X_legacy, X)
+
+
+@pytest.mark.parametrize(
+    "estimator", [CpuEstimator, VectorisedCpuEstimator, DeclaredCpuEstimator]
+)
+def test_dataset_has_feature_dtype(history, estimator):
+    X, _ = estimator.make_dataset(history)
+    assert X.dtype == np.float32
+    X, _ = estimator.make_dataset(history.iloc[:0])
+    assert X.dtype == np.float32
+    assert len(X) == 0
+
+
+class CachedCpuEstimator(CpuEstimator):
+    @classmethod
+    def make_feature_cache(cls):
+        return FeatureCache(by=("uid",))
+
+    @classmethod
+    def extract_features(cls, job, db, out=None, cache=None):
+        if cache is None:
+            return super().extract_features(job, db, out)
+        stats = cache.get("uid", job.uid)
+        return np.array([job.req_cpus, stats.count, stats.mean], dtype=np.float64)
+
+
+def test_make_dataset_with_feature_cache(history):
+    X, _ = CpuEstimator.make_dataset(history)
+    X_cached, _ = CachedCpuEstimator.make_dataset(history)
+    np.testing.assert_array_equal(X_cached[:, :2], X)
+    history = history.sort_values("submit", kind="stable", ignore_index=True)
+    mean = running_mean(as_submitted(history), history, "elapsed", "uid")
+    np.testing.assert_allclose(X_cached[:, 2], mean, rtol=1e-6)
+
+
+def test_target_conversions_of_arrays():
+    runtimes = np.array([0, 59, 3600, 86401], dtype="timedelta64[s]")
+    y = StatelessRuntimeEstimator.timedelta_to_y(runtimes)
+    assert y.dtype == np.float64
+    assert y.tolist() == [
+        StatelessRuntimeEstimator.timedelta_to_y(runtime.item())
+        for runtime in runtimes
+    ]
+    prediction = np.array([0.4, 59.0, 3600.6, 86401.0])
+    result = StatelessRuntimeEstimator.y_to_timedelta(prediction)
+    assert result.dtype == np.dtype("timedelta64[s]")
+    assert result.tolist() == [
+        timedelta(seconds=0),
+        timedelta(seconds=59),
+        timedelta(seconds=3601),
+        timedelta(seconds=86401),
+    ]
+    np.testing.assert_array_equal(
+        StatelessRuntimeEstimator.y_to_timedelta(y), runtimes
+    )
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+import pytest
+
+from slurm_model.data import JobState
+from slurm_model.data.expressions import compile_condition, compile_expression
+
+
+def test_compile_expression(jobs):
+    key = compile_expression(
+        "(state == RUNNING, req_cpus * k, elapsed > d)",
+        {"k": 2, "d": timedelta(seconds=2500), "unused": 1},
+    )
+    for job in jobs:
+        assert key(job) == (
+            job.state == JobState.RUNNING,
+            job.req_cpus * 2,
+            job.elapsed > timedelta(seconds=2500),
+        )
+
+
+@pytest.mark.parametrize("copies", [1, 250])
+def test_compile_condition_keeps_guards(jobs, copies):
+    # on large input clauses are reordered, `start_s > s` is the most
+    # selective one, but it raises for jobs, which were not started
+    records = jobs * copies
+    conditions = [
+        ("start is not None and start_s > s", {"s": 1704067500}),
+        ("req_cpus > 10", {}),
+    ]
+    predicate = compile_condition(conditions, records)
+    for job in jobs:
+        expected = (
+            job.start is not None and job.start_s > 1704067500 and job.req_cpus > 10
+        )
+        assert predicate(job) == expected
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from slurm_model.data import (
+    FAILURE_MASK,
+    ColumnarSlurmDBModel,
+    as_submitted,
+    jobs_to_frame,
+)
+from slurm_model.runtime_estimation.features import (
+    FeatureCache,
+    running_count,
+    running_mean,
+    running_state_count,
+    running_sum,
+)
+
+from tests.helpers import make_jobs
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    return jobs_to_frame(make_jobs(80, seed=2))
+
+
+def _visible(jobs: pd.DataFrame, history: pd.DataFrame, by: str | None):
+    """Brute force masks of history jobs visible to every job"""
+    for _, job in jobs.iterrows():
+        mask = (history["submit"] < job["submit"]).to_numpy()
+        if by is not None:
+            mask = mask & (history[by] == job[by]).to_numpy()
+        yield mask
+
+
+@pytest.mark.parametrize("by", [None, "uid", "partition"])
+def test_running_aggregates(history, by):
+    # jobs are in different order than history, so results must follow jobs
+    jobs = as_submitted(history.iloc[::-1].reset_index(drop=True))
+    elapsed = history["elapsed"].dt.total_seconds().to_numpy()
+    failed = FAILURE_MASK[history["state"].cat.codes.to_numpy()]
+    masks = list(_visible(jobs, history, by))
+    count = [mask.sum() for mask in masks]
+    total = [elapsed[mask].sum() for mask in masks]
+    mean = [elapsed[mask].mean() if mask.any() else np.nan for mask in masks]
+    failures = [(mask & failed).sum() for mask in masks]
+
+    np.testing.assert_allclose(running_count(jobs, history, by), count)
+    np.testing.assert_allclose(running_sum(jobs, history, "elapsed", by), total)
+    np.testing.assert_allclose(running_mean(jobs, history, "elapsed", by), mean)
+    np.testing.assert_allclose(
+        running_state_count(jobs, history, FAILURE_MASK, by), failures
+    )
+
+
+def test_running_aggregates_ties(history):
+    # jobs submitted at the same time do not see each other
+    jobs = as_submitted(history)
+    first = (history["submit"] == history["submit"].min()).to_numpy()
+    assert first.sum() > 1
+    assert running_count(jobs, history)[first].sum() == 0
+
+
+def test_running_aggregates_skip_missing(history):
+    # pending jobs have no end
+    jobs = as_submitted(history)
+    end = history["end"].to_numpy().astype("datetime64[s]")
+    present = ~np.isnat(end)
+    assert not present.all()
+    end = end.view("i8").astype(np.float64)
+    masks = [mask & present for mask in _visible(jobs, history, None)]
+    total = [end[mask].sum() for mask in masks]
+    mean = [end[mask].mean() if mask.any() else np.nan for mask in masks]
+
+    np.testing.assert_allclose(running_sum(jobs, history, "end"), total)
+    np.testing.assert_allclose(running_mean(jobs, history, "end"), mean)
+
+    cache = FeatureCache(by=("uid",), column="end")
+    for job in ColumnarSlurmDBModel(history).stream_jobs():
+        cache.add(job)
+    assert cache.total.count == present.sum()
+    assert cache.total.mean == pytest.approx(end[present].mean())
@@ -0,0 +1,25 @@
+from slurm_model.data import InMemorySlurmDBModel, JobState, SimpleJobRecord
+
+
+def test_jobs_running_on(jobs):
+    db = InMemorySlurmDBModel(jobs)
+    running = [job for job in jobs if job.state == JobState.RUNNING]
+    assert running
+    for node in ("n1", "n2", "n3", "n4"):
+        expected = {job.jobid for job in running if node in job.nodes}
+        assert set(db.jobs_running_on([node])) == expected
+    expected = {job.jobid for job in running if {"n1", "n2"} & set(job.nodes)}
+    assert set(db.jobs_running_on(["n1", "n2"])) == expected
+    assert not db.jobs_running_on(["unknown"])
+
+
+def test_jobs_running_on_follows_state(jobs):
+    db = InMemorySlurmDBModel(jobs)
+    job = next(job for job in jobs if job.state == JobState.RUNNING)
+    done = SimpleJobRecord.from_record(job)
+    done.state = JobState.COMPLETE
+    db.set_job(done)
+    assert job.jobid not in db.jobs_running_on(job.nodes)
+    db.set_job(job)
+    assert job.jobid in db.jobs_running_on(job.nodes)
+    assert all(job.jobid in db.jobs_running_on([node]) for node in job.nodes)
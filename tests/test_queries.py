@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from slurm_model.data import JobState
+
+T = datetime(2024, 1, 1, 0, 10)
+
+# condition, kwargs and the same condition as python function of record
+CONDITIONS = [
+    ("state == RUNNING", {}, lambda r: r.state == JobState.RUNNING),
+    ("not exitcode", {}, lambda r: not r.exitcode),
+    ("exitcode", {}, lambda r: r.exitcode),
+    ("end == None", {}, lambda r: r.end is None),
+    ("start is None", {}, lambda r: r.start is None),
+    ("len(nodes) > 0", {}, lambda r: len(r.nodes) > 0),
+    ("'n1' in nodes", {}, lambda r: "n1" in r.nodes),
+    ("partition == 1", {}, lambda r: False),
+    ("req_cpus * 100000000 > 0", {}, lambda r: r.req_cpus * 100000000 > 0),
+    ("state == 'RUNNING'", {}, lambda r: False),
+    (
+        "uid in users and req_cpus >= 8",
+        {"users": ["u1", "u2"]},
+        lambda r: r.uid in ("u1", "u2") and r.req_cpus >= 8,
+    ),
+    (
+        "state in states",
+        {"states": [JobState.RUNNING, JobState.FAILED]},
+        lambda r: r.state in (JobState.RUNNING, JobState.FAILED),
+    ),
+    (
+        "state != RUNNING or alloc_nodes == 2",
+        {},
+        lambda r: r.state != JobState.RUNNING or r.alloc_nodes == 2,
+    ),
+    ("submit_s % 7 < 3", {}, lambda r: r.submit_s % 7 < 3),
+    ("1 < req_cpus <= 30", {}, lambda r: 1 < r.req_cpus <= 30),
+    (
+        "elapsed > d",
+        {"d": timedelta(seconds=2500)},
+        lambda r: r.elapsed > timedelta(seconds=2500),
+    ),
+    ("end != t", {"t": T}, lambda r: r.end != T),
+    ("not (end == t)", {"t": T}, lambda r: not (r.end == T)),
+    (
+        "not (end == t or exitcode == 0)",
+        {"t": T},
+        lambda r: not (r.end == T or r.exitcode == 0),
+    ),
+    (
+        "start is not None and start_s > s",
+        {"s": 1704067500},
+        lambda r: r.start is not None and r.start_s > 1704067500,
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "condition, kwargs, predicate", CONDITIONS, ids=[c[0] for c in CONDITIONS]
+)
+def test_where(db, jobs, condition, kwargs, predicate):
+    query = db.select_jobs().where(condition, **kwargs)
+    result = [rec.jobid for rec in query.execute()]
+    assert result == [rec.jobid for rec in jobs if predicate(rec)]
+
+
+def test_where_chain_with_same_kwarg_names(db, jobs):
+    query = db.select_jobs().where("uid == x", x="u1").where("partition == x", x="gpu")
+    expected = [r.jobid for r in jobs if r.uid == "u1" and r.partition == "gpu"]
+    assert [rec.jobid for rec in query.execute()] == expected
+
+
+# sort expressions with descending flags and the same keys as python functions
+ORDERS = [
+    ([("submit", False)], [lambda r: r.submit]),
+    ([("priority", True)], [lambda r: r.priority]),
+    ([("uid", False), ("submit_s", True)], [lambda r: r.uid, lambda r: r.submit_s]),
+    (
+        [("req_cpus % 5", False), ("jobid", True)],
+        [lambda r: r.req_cpus % 5, lambda r: r.jobid],
+    ),
+    ([("len(nodes)", True)], [lambda r: len(r.nodes)]),
+]
+
+
+@pytest.mark.parametrize("orders, keys", ORDERS, ids=[str(o[0]) for o in ORDERS])
+def test_order_by(db, jobs, orders, keys):
+    query = db.select_jobs().where("req_cpus > 3")
+    for expression, descending in orders:
+        query = query.order_by(expression, descending=descending)
+    expected = [rec for rec in jobs if rec.req_cpus > 3]
+    for (_, descending), key in reversed(list(zip(orders, keys))):
+        expected.sort(key=key, reverse=descending)
+    assert [rec.jobid for rec in query.execute()] == [rec.jobid for rec in expected]
+
+
+def test_execute_batches(db, jobs):
+    query = db.select_jobs().where("state == RUNNING").order_by("submit")
+    batches = list(query.execute_batches(batch_size=4))
+    assert all(batch.num_rows <= 4 for batch in batches)
+    jobids = [jobid for batch in batches for jobid in batch["jobid"].to_pylist()]
+    assert jobids == [rec.jobid for rec in query.execute()]
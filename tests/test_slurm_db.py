@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from slurm_model.data import (
+    JOB_COLUMNS,
+    ColumnarSlurmDBModel,
+    InMemorySlurmDBModel,
+    JobRecord,
+    from_epoch_seconds,
+    to_epoch_seconds,
+)
+from slurm_model.runtime_estimation.features import FeatureCache
+
+from tests.helpers import make_jobs
+
+
+def _plain(job: JobRecord) -> SimpleNamespace:
+    """Record with protocol fields only"""
+    return SimpleNamespace(**{name: getattr(job, name) for name in JOB_COLUMNS})
+
+
+def test_records_are_job_records(jobs):
+    assert all(isinstance(job, JobRecord) for job in jobs)
+    assert all(
+        isinstance(job, JobRecord)
+        for job in ColumnarSlurmDBModel.from_records(jobs).stream_jobs()
+    )
+    assert all(
+        isinstance(job, JobRecord) for job in InMemorySlurmDBModel(jobs).stream_jobs()
+    )
+    assert isinstance(_plain(jobs[0]), JobRecord)
+    assert not isinstance(SimpleNamespace(jobid=1), JobRecord)
+
+
+@pytest.mark.parametrize("column", ["elapsed", "end", "req_cpus"])
+def test_feature_cache_needs_protocol_fields_only(column):
+    jobs = make_jobs(30, seed=3)
+    cache = FeatureCache(by=("uid",), column=column)
+    for job in jobs:
+        cache.add(_plain(job))
+    values = [getattr(job, f"{column}_s", None) for job in jobs]
+    if column == "req_cpus":
+        values = [job.req_cpus for job in jobs]
+    values = [value for value in values if value is not None]
+    assert cache.total.count == len(values)
+    assert cache.total.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_epoch_seconds(jobs):
+    for job in jobs:
+        seconds = to_epoch_seconds(job.submit)
+        assert seconds == np.datetime64(job.submit, "s").view("i8")
+        assert from_epoch_seconds(seconds) == job.submit
+    columnar = ColumnarSlurmDBModel.from_records(jobs).stream_jobs()
+    for job, view in zip(jobs, columnar):
+        for name in ("elapsed", "end", "start", "submit", "timelimit"):
+            assert getattr(view, f"{name}_s") == getattr(job, f"{name}_s"), name